@@ -0,0 +1,122 @@
+"""
+http_util.py
+============
+Small HTTP helpers shared by the matcher's reranker client and the Supabase
+scripts: a keep-alive HTTPS connection per thread, the error it raises for
+non-2xx responses, and JSON (de)serialization that uses orjson when installed.
+"""
+
+import http.client
+import json
+import threading
+from typing import Any, Dict, Optional, Set, Union
+
+try:
+    import orjson  # optional: pip install orjson — faster JSON for API payloads
+except ImportError:
+    orjson = None
+
+
+def json_dumps(value: Any) -> bytes:
+    """Serialize to UTF-8 JSON bytes, with orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value).encode("utf-8")
+
+
+def json_loads(data: Union[bytes, str]) -> Any:
+    """Parse JSON from bytes or str, with orjson when it is installed.
+    Errors are json.JSONDecodeError either way (orjson's subclasses it)."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class HTTPStatusError(http.client.HTTPException):
+    """Non-2xx response from KeepAliveHTTPS.request."""
+
+    def __init__(self, status: int, body: bytes, retry_after: Optional[float] = None):
+        super().__init__(f"HTTP {status}: {body[:200]!r}")
+        self.status = status
+        self.retry_after = retry_after
+
+
+class KeepAliveHTTPS:
+    """Persistent HTTPS connection to a single host, one per thread.
+
+    urllib.request.urlopen opens (and TLS-handshakes) a fresh socket on every
+    call. Reusing one connection per worker thread keeps it alive across
+    requests; http.client connections are not thread-safe, hence thread-local.
+    close() shuts every thread's socket; a later request simply reconnects.
+    """
+
+    # Errors that mean the kept-alive socket was closed by the server while idle.
+    _STALE_SOCKET_ERRORS = (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError)
+
+    def __init__(self, host: str, timeout: float = 30.0):
+        self.host = host
+        self.timeout = timeout
+        self._local = threading.local()
+        # Every thread's connection, so close() can reach them all
+        self._lock = threading.Lock()
+        self._open: Set[http.client.HTTPSConnection] = set()
+
+    def _connection(self) -> http.client.HTTPSConnection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = http.client.HTTPSConnection(self.host, timeout=self.timeout)
+            self._local.conn = conn
+            with self._lock:
+                self._open.add(conn)
+        return conn
+
+    def _discard(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            with self._lock:
+                self._open.discard(conn)
+        self._local.conn = None
+
+    def close(self) -> None:
+        with self._lock:
+            conns, self._open = self._open, set()
+        for conn in conns:
+            conn.close()
+
+    def request(
+        self,
+        method: str,
+        path: str,
+        body: Optional[bytes] = None,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> bytes:
+        """Send one request and return the response body.
+
+        Reconnects once if the idle connection had been dropped. Raises
+        HTTPStatusError for non-2xx responses and OSError / HTTPException
+        for transport failures.
+        """
+        try:
+            return self._send(method, path, body, headers or {})
+        except self._STALE_SOCKET_ERRORS:
+            return self._send(method, path, body, headers or {})
+
+    def _send(self, method: str, path: str, body: Optional[bytes], headers: Dict[str, str]) -> bytes:
+        conn = self._connection()
+        try:
+            conn.request(method, path, body=body, headers=headers)
+            resp = conn.getresponse()
+            data = resp.read()
+        except (http.client.HTTPException, OSError):
+            self._discard()
+            raise
+        if resp.will_close:
+            self._discard()
+        if not 200 <= resp.status < 300:
+            try:
+                retry_after = float(resp.getheader("retry-after") or "")
+            except ValueError:
+                retry_after = None
+            raise HTTPStatusError(resp.status, data, retry_after)
+        return data
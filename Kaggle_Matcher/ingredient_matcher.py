@@ -1,22 +1,43 @@
 import re
 import math
+import copy
 import json
 import os
-import urllib.request
-import urllib.error
+import hashlib
 from collections import defaultdict
-from typing import List, Dict, Any, Optional, Tuple, Set
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
+from typing import List, Dict, Any, Optional, Tuple, Set, FrozenSet, Callable
 
+import numpy as np
 import pandas as pd
 
 try:
-    from rapidfuzz import fuzz
+    from rapidfuzz import fuzz, process, utils
 except ImportError:
     raise ImportError(
         "rapidfuzz is required. Install it with:\n"
         "pip install rapidfuzz pandas"
     )
 
+try:
+    import ahocorasick  # optional: pip install pyahocorasick
+except ImportError:
+    ahocorasick = None
+
+try:
+    import pyarrow  # optional: pip install pyarrow — multithreaded C++ CSV reader
+    _CSV_ENGINE = "pyarrow"
+except ImportError:
+    _CSV_ENGINE = "c"
+
+try:
+    from .http_util import json_loads
+    from .reranker_client import ReplyCache, RerankerClient
+except ImportError:  # imported as a top-level module, from this directory
+    from http_util import json_loads
+    from reranker_client import ReplyCache, RerankerClient
+
 
 # ============================================================
 # CONFIG
@@ -29,13 +50,38 @@ CATALOG_CSV_PATH = "food_catalogue.csv"
 TOP_K = 5
 MIN_CANDIDATE_SCORE = 35.0
 MAX_PREFILTER_ROWS = 500          # raised from 300 — inverted index makes wider search cheap
+SAFETY_NET_PROBE_ROWS = 100       # full-catalog fallback: score the closest this many first, stop if none reaches MIN_TOP_MATCH_SCORE
 MIN_CANDIDATES_AFTER_BAD_FILTER = 15
 MIN_TOP_MATCH_SCORE = 60.0
+TEXT_CACHE_SIZE = 100_000         # memoized preprocess/skip/normalize results (ingredient lines repeat a lot)
+MATCH_CACHE_SIZE = 20_000         # per-matcher memo of finished part matches, reused across calls (oldest dropped first)
+PARALLEL_NORMALIZE_MIN_VALUES = 50_000  # n_jobs > 1: fewer distinct descriptions than this stay in-process
+CATALOG_CACHE_VERSION = 1         # catalog_cache_dir: bump when _prepare_catalog's output changes
 
 # ── LLM Reranker ─────────────────────────────────────────────────────────────
+# API host, retries, RPM pacing and batch polling are set in reranker_client.py.
 RERANKER_MODEL = "claude-opus-4-6"
 RERANKER_MAX_CANDIDATES = 10   # top-N fuzzy results sent to the LLM
 RERANKER_MAX_TOKENS = 150      # JSON response is tiny; 150 is generous headroom
+RERANKER_CACHE_VERSION = 2     # bump when prompts or the reply schema change to retire cached replies
+# Reranker API calls in flight at once in match_ingredients; raise it to match
+# the account's rate limits (env: RERANKER_MAX_CONCURRENCY).
+RERANKER_MAX_CONCURRENCY = max(1, int(os.environ.get("RERANKER_MAX_CONCURRENCY", "8")))
+# rerank_neighbors=True: a raw ingredient line with exactly the same words as one
+# already reranked (ignoring case, punctuation and word order) reuses that pick
+# when the same product is among its candidates. Oldest picks are dropped first.
+RERANKER_NEIGHBOR_CACHE_SIZE = 20_000
+# Ingredients packed into one reranker request (env: RERANKER_PACK_SIZE). 1 sends
+# one request per ingredient; larger packs share the system prompt and one
+# round-trip, with a fallback to single requests if a packed reply is malformed.
+RERANKER_PACK_SIZE = max(1, int(os.environ.get("RERANKER_PACK_SIZE", "1")))
+# skip_confident_reranks=True: keep the fuzzy ranking without an API call when the
+# top match scores at least this well and leads the runner-up by the margin.
+RERANKER_CONFIDENT_SCORE = 130.0   # the "high" confidence label
+RERANKER_CONFIDENT_MARGIN = 15.0
+# reranker_batch=True submits jobs through the Message Batches API (half price,
+# asynchronous — results usually within minutes, at most 24 h). One batch goes
+# out per match call, so pass a whole workload to match_ingredient_lists.
 
 RERANKER_SYSTEM = (
     "You are a grocery product matching assistant. You receive a recipe ingredient "
@@ -50,6 +96,22 @@ RERANKER_SYSTEM = (
     "Respond with JSON only — no text outside the JSON object."
 )
 
+RERANKER_PACKED_ITEM_TEMPLATE = (
+    'Ingredient {number}: "{raw}"\n'
+    'Normalized: "{normalized}"\n'
+    "Candidates (ranked by fuzzy score):\n"
+    "{candidates_json}"
+)
+
+RERANKER_PACKED_USER_TEMPLATE = (
+    "Match each of these {count} recipe ingredients independently; candidate "
+    "indexes refer to that ingredient's own list.\n\n"
+    "{items}\n\n"
+    "Respond with exactly one object whose results array has one entry per "
+    "ingredient, in order:\n"
+    '{{"results": [{{"choice": <integer index of best candidate, or null>, "reason": "<one sentence>"}}, ...]}}'
+)
+
 RERANKER_USER_TEMPLATE = (
     'Recipe ingredient: "{raw}"\n'
     'Normalized: "{normalized}"\n\n'
@@ -154,6 +216,9 @@ BAD_CATEGORY_HINTS = {
     "baby care": 35.0,
 }
 
+# Departments dropped outright by the prefilter (when enough food candidates remain)
+NON_FOOD_CATEGORY_PATTERN = "personal care|beauty|household|cleaning|pet|pharmacy"
+
 BAD_PRODUCT_TERMS = {
     "cracker": 18.0,
     "crackers": 18.0,
@@ -328,6 +393,98 @@ FORM_PREFERENCE_HINTS = {
     "chamomile tea": {"tea", "chamomile"},
 }
 
+# ---------------------------------------------------------------------------
+# Penalty-term scanning
+# BAD_PRODUCT_TERMS, PREPARED_FOOD_TERMS and BAD_CATEGORY_HINTS are all plain
+# substring checks. Testing them one `in` at a time means ~70 passes over every
+# candidate; an Aho-Corasick automaton reports every term present (overlaps
+# included, e.g. "chip" inside "chips") in a single pass over the text.
+# Without pyahocorasick installed we fall back to the per-term loop; the batch
+# form first rules out (text, term) pairs by 64-bit byte-set signatures.
+# ---------------------------------------------------------------------------
+_PENALTY_SCAN_TERMS: Set[str] = (
+    set(BAD_PRODUCT_TERMS) | PREPARED_FOOD_TERMS | set(BAD_CATEGORY_HINTS)
+)
+
+
+def _build_term_automaton(terms: Set[str]):
+    if ahocorasick is None:
+        return None
+    automaton = ahocorasick.Automaton()
+    for term in terms:
+        automaton.add_word(term, term)
+    automaton.make_automaton()
+    return automaton
+
+
+_PENALTY_TERM_AUTOMATON = _build_term_automaton(_PENALTY_SCAN_TERMS)
+
+
+def _byte_signatures(texts: List[str]) -> np.ndarray:
+    """64-bit signature per text with bit (b & 63) set for every UTF-8 byte b.
+
+    A term can only occur in a text if all of its signature bits are set in the
+    text's. Computed for every text at once over one concatenated buffer.
+    """
+    if not texts:
+        return np.zeros(0, dtype=np.uint64)
+    encoded = [text.encode("utf-8") for text in texts]
+    lengths = np.fromiter((len(b) for b in encoded), dtype=np.int64, count=len(encoded))
+    # A trailing separator keeps every start offset in range. The separator's
+    # bit can only add false positives, which the substring check removes.
+    buffer = np.frombuffer(b"\n".join(encoded) + b"\n", dtype=np.uint8)
+    starts = np.concatenate(([0], np.cumsum(lengths + 1)[:-1]))
+    bits = np.left_shift(np.uint64(1), (buffer & 63).astype(np.uint64))
+    signatures = np.bitwise_or.reduceat(bits, starts)
+    signatures[lengths == 0] = 0
+    return signatures
+
+
+_PENALTY_SCAN_ORDER: List[str] = sorted(_PENALTY_SCAN_TERMS)
+_PENALTY_TERM_SIGNATURES = _byte_signatures(_PENALTY_SCAN_ORDER)
+
+
+def _find_penalty_terms(text: str) -> Set[str]:
+    """Return every _PENALTY_SCAN_TERMS entry that occurs as a substring of `text`."""
+    if _PENALTY_TERM_AUTOMATON is not None:
+        return {term for _, term in _PENALTY_TERM_AUTOMATON.iter(text)}
+    return {term for term in _PENALTY_SCAN_TERMS if term in text}
+
+
+def _column_or(df: pd.DataFrame, col: str, default: Any) -> pd.Series:
+    """df[col], or a column of `default` on df's index when the catalog lacks it."""
+    return df[col] if col in df.columns else pd.Series(default, index=df.index)
+
+
+def _map_unique(values: pd.Series, func: Callable[[Any], Any], n_jobs: int = 1) -> pd.Series:
+    """values.map(func), calling func once per distinct value.
+
+    With n_jobs > 1 and enough distinct values, they are spread over that many
+    worker processes; func must then be a picklable module-level function.
+    """
+    unique_values = values.unique()
+    if n_jobs > 1 and len(unique_values) >= PARALLEL_NORMALIZE_MIN_VALUES:
+        chunksize = max(1, len(unique_values) // (n_jobs * 4))
+        with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+            mapped = list(executor.map(func, unique_values, chunksize=chunksize))
+        return values.map(dict(zip(unique_values, mapped)))
+    return values.map({value: func(value) for value in unique_values})
+
+
+def _penalty_terms_column(texts: pd.Series) -> pd.Series:
+    """Batch form of _find_penalty_terms: scan each distinct text once and map back."""
+    if _PENALTY_TERM_AUTOMATON is not None:
+        return _map_unique(texts, lambda text: frozenset(_find_penalty_terms(text)))
+
+    unique_texts = list(texts.unique())
+    signatures = _byte_signatures(unique_texts)
+    found: List[Set[str]] = [set() for _ in unique_texts]
+    for term, term_signature in zip(_PENALTY_SCAN_ORDER, _PENALTY_TERM_SIGNATURES):
+        for i in np.flatnonzero((signatures & term_signature) == term_signature).tolist():
+            if term in unique_texts[i]:
+                found[i].add(term)
+    return texts.map(dict(zip(unique_texts, map(frozenset, found))))
+
 # ---------------------------------------------------------------------------
 # V5: opposite modifier penalties
 # Keys are modifier tokens that survive normalize_ingredient().
@@ -354,12 +511,44 @@ OPPOSITE_MODIFIER_PENALTIES: Dict[str, Tuple[List[str], float]] = {
     # egg/egg-white handled via special case in _score_candidate
 }
 
+_NON_WORD_PHRASE_RE = re.compile(r"[^a-zA-Z\s]")
+
+
+def _any_word_matcher(phrases: Tuple[str, ...]) -> Callable[[str], bool]:
+    """Compile `phrases` into one predicate: True if any phrase appears in the text
+    the way _word_in would find it. Word phrases share a single word-boundary
+    anchored alternation; phrases with non-word characters (e.g. '2%') stay plain substrings."""
+    words = [p for p in phrases if not _NON_WORD_PHRASE_RE.search(p)]
+    literals = tuple(p for p in phrases if _NON_WORD_PHRASE_RE.search(p))
+    pattern = (
+        re.compile(r"\b(?:" + "|".join(re.escape(w) for w in words) + r")\b")
+        if words else None
+    )
+
+    def matches(text: str) -> bool:
+        if pattern is not None and pattern.search(text):
+            return True
+        return any(lit in text for lit in literals)
+
+    return matches
+
+
+@lru_cache(maxsize=None)
+def _word_matcher(phrase: str) -> Callable[[str], bool]:
+    return _any_word_matcher((phrase,))
+
+
 def _word_in(phrase: str, text: str) -> bool:
     """True if `phrase` appears as whole words in `text`.
     Falls back to plain substring for patterns with non-word characters (e.g. '2%')."""
-    if re.search(r"[^a-zA-Z\s]", phrase):
-        return phrase in text
-    return bool(re.search(r"\b" + re.escape(phrase) + r"\b", text))
+    return _word_matcher(phrase)(text)
+
+
+# OPPOSITE_MODIFIER_PENALTIES compiled once: (modifier matcher, any-opposite matcher, penalty)
+_OPPOSITE_MODIFIER_MATCHERS: List[Tuple[Callable[[str], bool], Callable[[str], bool], float]] = [
+    (_word_matcher(modifier), _any_word_matcher(tuple(opposites)), pen_value)
+    for modifier, (opposites, pen_value) in OPPOSITE_MODIFIER_PENALTIES.items()
+]
 
 STOP_TOKENS = {"and", "or", "with", "of"}
 
@@ -421,8 +610,67 @@ COOKWARE_HINTS = {
     "ceramic dish",
 }
 
+# Tokens that, on their own, make up a prep/serving note rather than an ingredient
+PREP_ONLY_TOKENS = {
+    "divided", "melted", "optional", "room", "temperature", "plus", "more",
+    "thinly", "sliced", "roughly", "finely", "chopped", "cored", "peeled",
+    "cut", "into", "for", "serving", "finishing", "beaten", "lightly",
+    "stems", "removed"
+}
+
+BARE_ADJECTIVE_FRAGMENTS = {
+    "dry", "wet", "hot", "cold", "warm", "large", "small",
+    "medium", "fresh", "frozen", "whole", "ground", "raw",
+    "cooked", "drained", "rinsed", "packed", "heaping",
+}
+
+
+def _substring_scan_order(terms) -> Tuple[str, ...]:
+    """Order terms for an any(term in text) check: shortest first, and drop any
+    term that contains another one (it can only match where the shorter does)."""
+    kept = [t for t in terms if not any(o != t and o in t for o in terms)]
+    return tuple(sorted(kept, key=lambda t: (len(t), t)))
+
+
+_COOKWARE_SCAN = _substring_scan_order(COOKWARE_HINTS)       # ("pan", "pot", "bowl", "dish", "skillet")
+_SKIP_CONTAINS_SCAN = _substring_scan_order(SKIP_PHRASE_CONTAINS)
+
 ALT_SPLIT_PATTERN = re.compile(r"\s+(?:and/or|or)\s+", re.IGNORECASE)
 
+# Text-cleaning patterns, compiled once instead of looked up per call (these
+# functions run for every ingredient line and every catalog row).
+_WHITESPACE_RE = re.compile(r"\s+")
+_PARENS_RE = re.compile(r"\([^)]*\)")
+_BRACKETS_RE = re.compile(r"\[[^\]]*\]")
+_MIXED_FRACTION_RE = re.compile(r"\b\d+\s*-\s*\d+/\d+\b")
+_FRACTION_RE = re.compile(r"\b\d+/\d+\b")
+_NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_NON_ALPHA_RE = re.compile(r"[^a-zA-Z\s]")
+_BASIC_CLEAN_TABLE = str.maketrans({"&": " and ", "®": " "})
+
+_GARNISH_LABEL_RE = re.compile(r"^\s*garnish\s*:\s*", re.IGNORECASE)
+_SERVING_TAIL_RE = re.compile(r",\s*(?:plus more|optional|for finishing|for serving).*$", re.IGNORECASE)
+_FIRST_COMMA_ITEM_RE = re.compile(r"^([^,]+),\s*(.+)$")
+_PAREN_OR_RE = re.compile(r"\(\s*or\s+[^)]+\)")
+_BARE_OR_RE = re.compile(r"\s+or\s+", re.IGNORECASE)
+_PLUS_QUANTITY_RE = re.compile(r"^\s*plus\s+\d+.*$", re.IGNORECASE)
+_AND_SPLIT_RE = re.compile(r"\s+and\s+", re.IGNORECASE)
+_GARNISH_PREFIX_RE = re.compile(r"^garnish\s*")
+_COLON_PREFIX_RE = re.compile(r"^:\s*")
+
+# normalize_ingredient: everything from the first note phrase on is dropped
+_NOTE_TAIL_RE = re.compile(
+    r"\b(?:plus more|for serving|for finishing|cut into|torn into|such as|about"
+    r"|storebought or homemade|depending on)\b.*$"
+)
+# Applied in order: each replacement can feed the next ("chile flakes flakes")
+_PEPPER_FLAKES_RES = tuple(
+    re.compile(rf"\b{phrase} flakes\b") for phrase in ("chile", "chili", "red pepper", "pepper")
+)
+_WHITE_SUGAR_RE = re.compile(r"\bwhite sugar\b")
+_SUGAR_WHITE_RE = re.compile(r"\bsugar\s*\(?\s*white\b")
+_CANE_SUGAR_RE = re.compile(r"\bcane sugar\b")
+
 
 # ============================================================
 # TEXT CLEANING
@@ -456,28 +704,27 @@ def parse_min_price(price_str: Any) -> Optional[float]:
 
 
 def normalize_spaces(text: str) -> str:
-    return re.sub(r"\s+", " ", text).strip()
+    return _WHITESPACE_RE.sub(" ", text).strip()
 
 
 def strip_brackets_and_parens(text: str) -> str:
-    text = re.sub(r"\([^)]*\)", " ", text)
-    text = re.sub(r"\[[^\]]*\]", " ", text)
+    text = _PARENS_RE.sub(" ", text)
+    text = _BRACKETS_RE.sub(" ", text)
     return text
 
 
 def remove_fractions_numbers(text: str) -> str:
-    text = re.sub(r"\b\d+\s*-\s*\d+/\d+\b", " ", text)
-    text = re.sub(r"\b\d+/\d+\b", " ", text)
-    text = re.sub(r"\b\d+(?:\.\d+)?\b", " ", text)
+    text = _MIXED_FRACTION_RE.sub(" ", text)
+    text = _FRACTION_RE.sub(" ", text)
+    text = _NUMBER_RE.sub(" ", text)
     return text
 
 
 def basic_clean(text: str) -> str:
     text = safe_str(text).lower()
     text = strip_brackets_and_parens(text)
-    text = text.replace("&", " and ")
-    text = text.replace("®", " ")
-    text = re.sub(r"[^a-zA-Z\s]", " ", text)
+    text = text.translate(_BASIC_CLEAN_TABLE)
+    text = _NON_ALPHA_RE.sub(" ", text)
     return normalize_spaces(text)
 
 
@@ -501,6 +748,7 @@ def dedupe_adjacent_tokens(tokens: List[str]) -> List[str]:
     return deduped
 
 
+@lru_cache(maxsize=TEXT_CACHE_SIZE)
 def preprocess_ingredient(raw_ingredient: str) -> str:
     """Clean modifier/garnish tails before skip logic and matching."""
     text = safe_str(raw_ingredient).strip()
@@ -508,17 +756,14 @@ def preprocess_ingredient(raw_ingredient: str) -> str:
     if not text:
         return ""
 
-    text = re.sub(r"^\s*garnish\s*:\s*", "", text, flags=re.IGNORECASE)
-    text = re.sub(r",\s*plus more.*$", "", text, flags=re.IGNORECASE)
-    text = re.sub(r",\s*optional.*$", "", text, flags=re.IGNORECASE)
-    text = re.sub(r",\s*for finishing.*$", "", text, flags=re.IGNORECASE)
-    text = re.sub(r",\s*for serving.*$", "", text, flags=re.IGNORECASE)
+    text = _GARNISH_LABEL_RE.sub("", text)
+    text = _SERVING_TAIL_RE.sub("", text)
 
     # Strip comma-separated list: keep only the FIRST item.
     # Guard: if everything after the first comma is prep/modifier words only
     # (e.g. "divided", "lightly beaten"), leave it alone — those get stripped
     # later by normalize_ingredient's PREP_WORDS filter.
-    m = re.match(r"^([^,]+),\s*(.+)$", text)
+    m = _FIRST_COMMA_ITEM_RE.match(text)
     if m:
         rest_words = m.group(2).strip().lower().split()
         rest_is_prep_only = all(w in PREP_WORDS for w in rest_words)
@@ -528,15 +773,15 @@ def preprocess_ingredient(raw_ingredient: str) -> str:
     # Strip bare "or" alternatives: "X or Y" → "X".
     # Guard 1: remove parenthetical "(or ...)" first — qualifiers, not alternatives.
     # Guard 2: don't strip when the word before "or" is a prep/modifier.
-    text = re.sub(r"\(\s*or\s+[^)]+\)", "", text)
-    m2 = re.search(r"\s+or\s+", text, flags=re.IGNORECASE)
+    text = _PAREN_OR_RE.sub("", text)
+    m2 = _BARE_OR_RE.search(text)
     if m2:
         before = text[:m2.start()].strip()
         before_last = before.split()[-1].lower() if before.split() else ""
         if before_last not in PREP_WORDS:
             text = before
 
-    if re.match(r"^\s*plus\s+\d+.*$", text, flags=re.IGNORECASE):
+    if _PLUS_QUANTITY_RE.match(text):
         return ""
 
     return text.strip()
@@ -544,7 +789,7 @@ def preprocess_ingredient(raw_ingredient: str) -> str:
 
 def looks_like_cookware(text: str) -> bool:
     t = basic_clean(text)
-    return any(hint in t for hint in COOKWARE_HINTS)
+    return any(hint in t for hint in _COOKWARE_SCAN)
 
 
 def strip_quantity_like_prefix(text: str) -> str:
@@ -553,6 +798,7 @@ def strip_quantity_like_prefix(text: str) -> str:
     return normalize_spaces(text)
 
 
+@lru_cache(maxsize=TEXT_CACHE_SIZE)
 def should_skip_ingredient(raw_ingredient: str) -> Tuple[bool, str]:
     raw_ingredient = preprocess_ingredient(raw_ingredient)
     t = basic_clean(raw_ingredient)
@@ -567,33 +813,22 @@ def should_skip_ingredient(raw_ingredient: str) -> Tuple[bool, str]:
     if looks_like_cookware(t):
         return True, "cookware/container phrase"
 
-    for phrase in SKIP_PHRASES:
-        if t == phrase:
-            return True, "non-ingredient fragment"
-
-    prep_only_tokens = {
-        "divided", "melted", "optional", "room", "temperature", "plus", "more",
-        "thinly", "sliced", "roughly", "finely", "chopped", "cored", "peeled",
-        "cut", "into", "for", "serving", "finishing", "beaten", "lightly",
-        "stems", "removed"
-    }
+    if t in SKIP_PHRASES:
+        return True, "non-ingredient fragment"
 
     tokens = set(t.split())
-    if tokens and tokens.issubset(prep_only_tokens):
+    if tokens and tokens.issubset(PREP_ONLY_TOKENS):
         return True, "prep-only fragment"
 
     t_no_qty_clean = basic_clean(t_no_qty).strip()
-    if t_no_qty_clean in {"dry", "wet", "hot", "cold", "warm", "large", "small",
-                          "medium", "fresh", "frozen", "whole", "ground", "raw",
-                          "cooked", "drained", "rinsed", "packed", "heaping"}:
+    if t_no_qty_clean in BARE_ADJECTIVE_FRAGMENTS:
         return True, "bare adjective fragment"
 
     if "plus more" in t or "for serving" in t or "for finishing" in t:
         return True, "serving note"
 
-    for phrase in SKIP_PHRASE_CONTAINS:
-        if phrase in t:
-            return True, "prep instruction fragment"
+    if any(phrase in t for phrase in _SKIP_CONTAINS_SCAN):
+        return True, "prep instruction fragment"
 
     if t.startswith("plus ") and ("room temperature" in t or "optional" in t):
         return True, "leftover modifier fragment"
@@ -614,8 +849,8 @@ def extract_garnish_core(raw_ingredient: str) -> str:
     if not lower.startswith("garnish"):
         return text
 
-    lower = re.sub(r"^garnish\s*", "", lower).strip()
-    lower = re.sub(r"^:\s*", "", lower).strip()
+    lower = _GARNISH_PREFIX_RE.sub("", lower).strip()
+    lower = _COLON_PREFIX_RE.sub("", lower).strip()
 
     if "cinnamon" in lower:
         return "cinnamon"
@@ -695,84 +930,53 @@ def split_compound_ingredient(raw_ingredient: str) -> List[str]:
     lower = basic_clean(text)
 
     if "salt" in lower and "pepper" in lower and " and " in lower:
-        parts = re.split(r"\s+and\s+", text, flags=re.IGNORECASE)
+        parts = _AND_SPLIT_RE.split(text)
         return [p.strip(" ,") for p in parts if p.strip(" ,")]
 
     return [text]
 
 
+@lru_cache(maxsize=TEXT_CACHE_SIZE)
 def normalize_ingredient(raw_ingredient: str) -> str:
     raw_ingredient = preprocess_ingredient(raw_ingredient)
     raw_ingredient = extract_garnish_core(raw_ingredient)
 
-    text = basic_clean(raw_ingredient)
-    text = remove_fractions_numbers(text)
+    raw_lower = basic_clean(raw_ingredient)
+    text = remove_fractions_numbers(raw_lower)
 
-    text = re.sub(r"\bplus more\b.*$", " ", text)
-    text = re.sub(r"\bfor serving\b.*$", " ", text)
-    text = re.sub(r"\bfor finishing\b.*$", " ", text)
-    text = re.sub(r"\bcut into\b.*$", " ", text)
-    text = re.sub(r"\btorn into\b.*$", " ", text)
-    text = re.sub(r"\bsuch as\b.*$", " ", text)
-    text = re.sub(r"\babout\b.*$", " ", text)
-    text = re.sub(r"\bstorebought or homemade\b.*$", " ", text)
-    text = re.sub(r"\bdepending on\b.*$", " ", text)
-    text = re.sub(r"^garnish\s*", " ", text)
-
-    text = text.replace("extra virgin", "extra-virgin")
-    text = text.replace("apple cider vinegar", "apple-cider-vinegar")
-    # Chile flake synonyms → crushed red pepper
-    text = re.sub(r"\bchile flakes\b", "crushed red pepper", text)
-    text = re.sub(r"\bchili flakes\b", "crushed red pepper", text)
-    text = re.sub(r"\bred pepper flakes\b", "crushed red pepper", text)
-    text = re.sub(r"\bpepper flakes\b", "crushed red pepper", text)
-    text = re.sub(r"\bwhite sugar\b", "granulated sugar", text)
-    text = re.sub(r"\bsugar\s*\(?\s*white\b", "granulated sugar", text)
-    text = re.sub(r"\bcane sugar\b", "granulated sugar", text)
-    text = text.replace("chicken broth", "chicken-broth")
-    text = text.replace("chicken stock", "chicken-stock")
+    text = _NOTE_TAIL_RE.sub(" ", text)
+    text = _GARNISH_PREFIX_RE.sub(" ", text)
 
+    # Chile flake synonyms → crushed red pepper
+    for pattern in _PEPPER_FLAKES_RES:
+        text = pattern.sub("crushed red pepper", text)
+    text = _WHITE_SUGAR_RE.sub("granulated sugar", text)
+    text = _SUGAR_WHITE_RE.sub("granulated sugar", text)
+    text = _CANE_SUGAR_RE.sub("granulated sugar", text)
+
+    # One pass over the tokens: drop units, prep words and "of", singularize and
+    # map spirit styles. basic_clean leaves letters and spaces only, so no token
+    # needs re-splitting.
     tokens = []
     for token in text.split():
-        token = token.replace("-", " ")
-        for subtoken in token.split():
-            if subtoken in UNITS:
-                continue
-            if subtoken in PREP_WORDS:
-                continue
-            subtoken = singularize_token(subtoken)
-            # Apply spirit synonyms: map regional/style terms → catalog-searchable spirit name
-            if subtoken in SPIRIT_SYNONYMS:
-                raw_lower_check = basic_clean(raw_ingredient)
-                if subtoken == "scotch" and any(x in raw_lower_check for x in ["bonnet", "pepper", "chile", "chili"]):
-                    pass
-                else:
-                    subtoken = SPIRIT_SYNONYMS.get(subtoken, subtoken)
-            tokens.append(subtoken)
+        if token in UNITS or token in PREP_WORDS or token == "of":
+            continue
+        token = singularize_token(token)
+        # Apply spirit synonyms: map regional/style terms → catalog-searchable spirit name
+        if token in SPIRIT_SYNONYMS:
+            if not (token == "scotch" and any(x in raw_lower for x in ["bonnet", "pepper", "chile", "chili"])):
+                token = SPIRIT_SYNONYMS[token]
+        tokens.append(token)
 
     cleaned = " ".join(tokens)
-    cleaned = cleaned.replace("apple cider vinegar", "apple-cider-vinegar")
-    cleaned = cleaned.replace("chicken broth", "chicken-broth")
-    cleaned = cleaned.replace("chicken stock", "chicken-stock")
-    cleaned = re.sub(r"\bof\b", " ", cleaned)
-    cleaned = normalize_spaces(cleaned)
-
-    cleaned = cleaned.replace("apple-cider-vinegar", "apple cider vinegar")
-    cleaned = cleaned.replace("chicken-broth", "chicken broth")
-    cleaned = cleaned.replace("chicken-stock", "chicken stock")
-
     cleaned = SYNONYM_MAP.get(cleaned, cleaned)
-
-    deduped = dedupe_adjacent_tokens(cleaned.split())
-    cleaned = " ".join(deduped)
+    cleaned = " ".join(dedupe_adjacent_tokens(cleaned.split()))
 
     if "round italian loaf" in cleaned:
         cleaned = "italian bread"
     elif cleaned.endswith(" loaf"):
         cleaned = cleaned.replace(" loaf", " bread")
 
-    raw_lower = basic_clean(raw_ingredient)
-
     if cleaned.endswith(" wheel") or cleaned.endswith(" wedge") or cleaned.endswith(" twist"):
         parts = cleaned.split()
         if parts:
@@ -825,16 +1029,184 @@ def important_tokens(text: str) -> List[str]:
     return tokens
 
 
+@lru_cache(maxsize=TEXT_CACHE_SIZE)
+def _ingredient_features(normalized_ingredient: str) -> Tuple[
+    int,
+    FrozenSet[str],
+    Tuple[str, ...],
+    bool,
+    Tuple[Tuple[Callable[[str], bool], Callable[[str], bool], float], ...],
+]:
+    """Product-independent inputs to IngredientMatcher._score_candidate, computed
+    once per ingredient instead of once per candidate row.
+
+    Returns (token count, token set, category hints, is-spirit flag, opposite
+    modifier rules whose modifier appears in the ingredient).
+    """
+    tokens = important_tokens(normalized_ingredient)
+    token_set = frozenset(tokens)
+
+    hints: Set[str] = set()
+    for token in token_set:
+        hints |= INGREDIENT_CATEGORY_HINTS.get(token, set())
+
+    modifier_rules = tuple(
+        rule for rule in _OPPOSITE_MODIFIER_MATCHERS if rule[0](normalized_ingredient)
+    )
+    return len(tokens), token_set, tuple(hints), bool(token_set & SPIRIT_TOKENS), modifier_rules
+
+
+# ============================================================
+# RERANKER PROMPTS AND REPLIES
+# ============================================================
+
+def _prompt_candidates(candidates: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Lean candidate list for the reranker prompt — only what the LLM needs.
+    Empty brand/category fields are left out rather than sent as ""."""
+    prompt_candidates = []
+    for i, c in enumerate(candidates[:RERANKER_MAX_CANDIDATES]):
+        entry = {"index": i, "description": c["description"]}
+        brand = c.get("brand", "")
+        category = c.get("categories", c.get("classifier", ""))
+        if brand:
+            entry["brand"] = brand
+        if category:
+            entry["category"] = category
+        entry["fuzzy_score"] = c["score"]
+        prompt_candidates.append(entry)
+    return prompt_candidates
+
+
+def _promote_candidate(candidates: List[Dict[str, Any]], choice: int, reason: str) -> List[Dict[str, Any]]:
+    """Move the reranker's pick to position 0; keep the rest after."""
+    chosen = {**candidates[choice], "reranker_reason": reason, "reranker_choice": True}
+    rest = [
+        {**c, "reranker_choice": False}
+        for i, c in enumerate(candidates)
+        if i != choice
+    ]
+    return [chosen] + rest
+
+
+def _compact_json(value: Any) -> str:
+    """JSON without indentation or padding; every byte is an input token we pay for."""
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False)
+
+
+_JSON_FENCE_RE = re.compile(r"^```(?:json)?\s*|\s*```$")
+
+
+def _parse_json_object(text: str) -> Optional[Dict[str, Any]]:
+    """Parse the single JSON object in an LLM reply.
+
+    Tolerates markdown fences and stray prose around the object. Returns None
+    when no object can be recovered (including when the reply is valid JSON
+    but not an object).
+    """
+    text = _JSON_FENCE_RE.sub("", text.strip())
+    attempts = [text]
+    start, end = text.find("{"), text.rfind("}")
+    if 0 <= start < end and text[start:end + 1] != text:
+        attempts.append(text[start:end + 1])
+    for attempt in attempts:
+        try:
+            parsed = json_loads(attempt)
+        except json.JSONDecodeError:
+            continue
+        if isinstance(parsed, dict):
+            return parsed
+    return None
+
+
 # ============================================================
 # MATCHER
 # ============================================================
 
 class IngredientMatcher:
-    def __init__(self, catalog_csv_path: str, use_reranker: bool = False, anthropic_api_key: Optional[str] = None):
-        self.catalog_csv_path = catalog_csv_path
-        self.df = self._load_catalog(catalog_csv_path)
+    def __init__(
+        self,
+        catalog_csv_path: str,
+        use_reranker: bool = False,
+        anthropic_api_key: Optional[str] = None,
+        reranker_cache_path: Optional[str] = None,
+        rerank_neighbors: bool = False,
+        reranker_batch: bool = False,
+        skip_confident_reranks: bool = False,
+        n_jobs: int = 1,
+        catalog_cache_dir: Optional[str] = None,
+    ):
+        self._setup(
+            catalog_csv_path,
+            self._load_catalog(catalog_csv_path, n_jobs, catalog_cache_dir),
+            use_reranker,
+            anthropic_api_key,
+            reranker_cache_path,
+            rerank_neighbors,
+            reranker_batch,
+            skip_confident_reranks,
+        )
+
+    @classmethod
+    def from_dataframe(
+        cls,
+        df: pd.DataFrame,
+        use_reranker: bool = False,
+        anthropic_api_key: Optional[str] = None,
+        source: str = "<dataframe>",
+        reranker_cache_path: Optional[str] = None,
+        rerank_neighbors: bool = False,
+        reranker_batch: bool = False,
+        skip_confident_reranks: bool = False,
+        n_jobs: int = 1,
+    ) -> "IngredientMatcher":
+        """Build a matcher from an in-memory catalog in any supported format
+        (e.g. rows fetched straight from Supabase) without a CSV round-trip."""
+        matcher = cls.__new__(cls)
+        catalog = matcher._prepare_catalog(matcher._adapt_catalog_format(df.copy()), n_jobs)
+        matcher._setup(
+            source, catalog, use_reranker, anthropic_api_key,
+            reranker_cache_path, rerank_neighbors, reranker_batch,
+            skip_confident_reranks,
+        )
+        return matcher
+
+    def _setup(
+        self,
+        source: str,
+        df: pd.DataFrame,
+        use_reranker: bool,
+        anthropic_api_key: Optional[str],
+        reranker_cache_path: Optional[str] = None,
+        rerank_neighbors: bool = False,
+        reranker_batch: bool = False,
+        skip_confident_reranks: bool = False,
+    ) -> None:
+        self.catalog_csv_path = source
+        self.df = df
         self._index, self._prefix_index = self._build_index()
+        # (part, top_k) → finished match, so lines shared by many recipes are
+        # scored (and reranked) once per matcher; callers always get a copy
+        self._match_cache: Dict[Tuple[str, int], Dict[str, Any]] = {}
+        self._non_food_category = df["is_non_food_category"].to_numpy(dtype=bool)
+        # Alphabetical rank of each row's description_norm (ties share a rank),
+        # the prefilter's secondary sort key
+        self._description_rank = np.unique(
+            df["description_norm"].to_numpy(dtype=object), return_inverse=True
+        )[1].reshape(-1)
         self.use_reranker = use_reranker
+        # Reranker worker threads, started on first use and kept for the matcher's
+        # lifetime so their keep-alive sockets survive across match_ingredients calls
+        self._executor: Optional[ThreadPoolExecutor] = None
+        # Optional on-disk cache of reranker replies, reused across runs
+        self._reply_cache = ReplyCache(reranker_cache_path) if reranker_cache_path else None
+        # Opt-in reuse of earlier reranker picks for reworded ingredient lines:
+        # _neighbor_key(raw line) → (chosen productId, raw line it was chosen for)
+        self._rerank_neighbors = rerank_neighbors
+        self._rerank_decisions: Dict[str, Tuple[str, str]] = {}
+        # Send multi-job reranks through the Message Batches API instead of live calls
+        self._reranker_batch = reranker_batch
+        # Leave clear fuzzy wins alone instead of paying for a rerank
+        self._skip_confident_reranks = skip_confident_reranks
         # API key: explicit arg → ANTHROPIC_API_KEY env var → None (reranker disabled)
         self._api_key = anthropic_api_key or os.environ.get("ANTHROPIC_API_KEY")
         if use_reranker and not self._api_key:
@@ -842,6 +1214,9 @@ class IngredientMatcher:
                 "use_reranker=True requires an Anthropic API key. "
                 "Pass anthropic_api_key= or set the ANTHROPIC_API_KEY environment variable."
             )
+        # Paced, retrying API client shared by every reranker call (one
+        # keep-alive socket per thread)
+        self._client = RerankerClient(self._api_key)
 
     # Mapping from new-format classifier labels → category strings the scorer understands.
     # NOTE: the new-format classifiers are ML-generated for recipe context and are noisy
@@ -865,9 +1240,59 @@ class IngredientMatcher:
         # OTHER_INGR is a catch-all with no useful signal.
     }
 
-    def _load_catalog(self, path: str) -> pd.DataFrame:
-        df = pd.read_csv(path)
-
+    # Every CSV column that format detection or any adapter reads; the rest of a
+    # catalog export (descriptions, nutrition, timestamps, ...) is never parsed.
+    _CATALOG_SOURCE_COLUMNS = frozenset({
+        "productId", "id", "upc",
+        "description", "name", "brand", "store",
+        "categories", "classifier", "classifiers", "taxonomy", "search_keyword",
+        "price", "price_raw", "size", "quantity",
+        "image_url", "image", "store_ids", "store_id",
+    })
+
+    def _load_catalog(self, path: str, n_jobs: int = 1, cache_dir: Optional[str] = None) -> pd.DataFrame:
+        """Read and prepare a catalog CSV. With cache_dir, the prepared frame is
+        pickled there and reused until the CSV's size or mtime changes."""
+        cache_path = self._catalog_cache_path(path, cache_dir) if cache_dir else None
+        if cache_path is not None and os.path.exists(cache_path):
+            try:
+                return pd.read_pickle(cache_path)
+            except Exception as exc:
+                print(f"[catalog] Ignoring unreadable cache {cache_path}: {exc}")
+
+        # The pyarrow engine only takes a list for usecols, so read the header first
+        header = pd.read_csv(path, nrows=0).columns
+        usecols = [col for col in header if col in self._CATALOG_SOURCE_COLUMNS]
+        df = pd.read_csv(path, engine=_CSV_ENGINE, usecols=usecols)
+        catalog = self._prepare_catalog(self._adapt_catalog_format(df), n_jobs)
+
+        if cache_path is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+            # Write-then-rename so a crash never leaves a truncated cache behind
+            tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+            catalog.to_pickle(tmp_path)
+            os.replace(tmp_path, cache_path)
+        return catalog
+
+    @classmethod
+    def _catalog_cache_path(cls, path: str, cache_dir: str) -> str:
+        stat = os.stat(path)
+        # The term tables behind the cached penalty/classifier/adapter columns are
+        # part of the key, so tuning any of them invalidates old caches automatically
+        tables = [
+            sorted(BAD_PRODUCT_TERMS.items()), sorted(PREPARED_FOOD_TERMS),
+            sorted(BAD_CATEGORY_HINTS.items()), NON_FOOD_CATEGORY_PATTERN,
+            sorted(GOOD_CLASSIFIERS), sorted(cls._NEW_FORMAT_CLASSIFIER_TO_CATEGORY.items()),
+            sorted(cls._KW_TRAILING_STOPWORDS),
+        ]
+        key = _compact_json([
+            os.path.abspath(path), stat.st_size, stat.st_mtime_ns,
+            CATALOG_CACHE_VERSION, pd.__version__, tables,
+        ])
+        name = os.path.splitext(os.path.basename(path))[0]
+        return os.path.join(cache_dir, f"{name}-{hashlib.sha256(key.encode('utf-8')).hexdigest()[:16]}.pkl")
+
+    def _adapt_catalog_format(self, df: pd.DataFrame) -> pd.DataFrame:
         # ── Auto-detect catalog format ───────────────────────────────────────
         # Format A (food_catalogue.csv): 'description', 'categories', 'classifier', 'search_keyword'
         # Format B (kroger_ingredients_rows.csv): 'name', 'classifiers' (JSON array), 'id', 'price'
@@ -881,7 +1306,15 @@ class IngredientMatcher:
         elif "name" in df.columns and "taxonomy" in df.columns and "store" in df.columns:
             # Format D — scraped_ingredients (multi-store, taxonomy-based)
             df = self._adapt_scraped_catalog_format(df)
+        return df
+
+    def _prepare_catalog(self, df: pd.DataFrame, n_jobs: int = 1) -> pd.DataFrame:
+        """Fill required columns and precompute every per-product field the scorer reads.
 
+        n_jobs > 1 normalizes product descriptions (nearly one distinct value per
+        row) across that many processes; on spawn-based platforms the calling
+        script needs an ``if __name__ == "__main__":`` guard.
+        """
         required_cols = [
             "productId", "brand", "description",
             "categories", "classifier", "search_keyword"
@@ -900,11 +1333,16 @@ class IngredientMatcher:
                     .str.replace("â„¢", "™", regex=False)
                     .str.replace("Ã©", "é", regex=False)
                     .str.replace("â€™", "'", regex=False))
-        df["description_norm"] = df["description"].map(normalize_catalog_text)
-        df["brand_norm"] = df["brand"].map(normalize_catalog_text)
-        df["categories_norm"] = df["categories"].map(normalize_catalog_text)
-        df["classifier_norm"] = df["classifier"].map(normalize_catalog_text)
-        df["search_keyword_norm"] = df["search_keyword"].map(normalize_catalog_text)
+        # Brand/category/classifier/keyword columns hold a few hundred distinct
+        # values across the whole catalog; normalize each distinct value once.
+        df["description_norm"] = _map_unique(df["description"], normalize_catalog_text, n_jobs)
+        df["brand_norm"] = _map_unique(df["brand"], normalize_catalog_text)
+        df["categories_norm"] = _map_unique(df["categories"], normalize_catalog_text)
+        df["classifier_norm"] = _map_unique(df["classifier"], normalize_catalog_text)
+        df["search_keyword_norm"] = _map_unique(df["search_keyword"], normalize_catalog_text)
+        df["good_classifier"] = _map_unique(
+            df["classifier"], lambda value: safe_str(value).upper() in GOOD_CLASSIFIERS
+        ).astype(bool)
 
         df["combined_text"] = (
             df["description_norm"] + " " +
@@ -914,6 +1352,27 @@ class IngredientMatcher:
             df["search_keyword_norm"]
         ).map(normalize_spaces)
 
+        # Penalty terms depend only on the product, so scan each distinct text once
+        # here rather than once per (ingredient, candidate) pair in _score_candidate.
+        desc_terms = _penalty_terms_column(df["description_norm"])
+        cats_terms = _penalty_terms_column(df["categories_norm"])
+        classifier_terms = _penalty_terms_column(df["classifier_norm"])
+        df["desc_penalty_terms"] = desc_terms
+        df["category_penalty_terms"] = [
+            c | k for c, k in zip(cats_terms, classifier_terms)
+        ]
+        df["is_non_food_category"] = df["categories_norm"].str.contains(
+            NON_FOOD_CATEGORY_PATTERN, regex=True, na=False
+        )
+        # Cheapest listed price per product (NaN when unpriced), parsed once per
+        # distinct price string instead of once per scored candidate.
+        if "price" in df.columns:
+            df["min_price"] = _map_unique(
+                df["price"], lambda value: parse_min_price(safe_str(value))
+            ).astype(float)
+        else:
+            df["min_price"] = np.nan
+
         return df
 
     # Trailing noise words stripped when synthesizing search_keyword from product name.
@@ -932,7 +1391,7 @@ class IngredientMatcher:
         catalog format has no explicit search_keyword column.
         """
         text = re.sub(r"[®™°–]", " ", name.lower())
-        text = re.sub(r"\([^)]*\)", " ", text)
+        text = _PARENS_RE.sub(" ", text)
         text = re.sub(r"\d+[\d./]*\s*(?:oz|lb|lbs|g|kg|ml|fl|ct|pk|ea)", " ", text)
         text = re.sub(r"[^a-z\s]", " ", text)
         text = normalize_spaces(text)
@@ -945,41 +1404,36 @@ class IngredientMatcher:
 
     def _adapt_new_catalog_format(self, df: pd.DataFrame) -> pd.DataFrame:
         """Convert new-format catalog (name/classifiers/price) to old-format column layout."""
-        import json as _json
-
         def parse_cls(v: str) -> List[str]:
             try:
-                return _json.loads(v)
+                return json_loads(v)
             except Exception:
                 return []
 
         classifiers_list = df["classifiers"].map(parse_cls)
 
-        out = pd.DataFrame()
-        out["productId"]   = df.get("id", pd.Series(range(len(df))))
-        out["brand"]       = df.get("brand", pd.Series([""] * len(df))).fillna("")
-        out["description"] = df["name"]
-        out["price"]       = df.get("price", pd.Series([None] * len(df)))
-
-        out["categories"] = classifiers_list.map(
-            lambda cls: "; ".join(
-                self._NEW_FORMAT_CLASSIFIER_TO_CATEGORY[c]
-                for c in cls
-                if c in self._NEW_FORMAT_CLASSIFIER_TO_CATEGORY
-            )
-        )
-        out["classifier"] = classifiers_list.map(
-            lambda cls: cls[0] if cls else ""
-        )
-        # Synthesize search_keyword from trailing content words of the product name.
-        # This restores the 0.15 * score_keyword fuzzy score contribution that the
-        # old catalog provided via its explicit search_keyword column.
-        out["search_keyword"] = df["name"].map(self._synthesize_search_keyword)
-        out["size"]       = df.get("size", pd.Series([""] * len(df))).fillna("")
-        out["image_url"]  = df.get("image", pd.Series([""] * len(df))).fillna("")
-        out["store_ids"]  = df.get("store_id", pd.Series([""] * len(df))).fillna("")
-
-        return out
+        # Built in one constructor call rather than column by column
+        return pd.DataFrame({
+            "productId":   _column_or(df, "id", range(len(df))),
+            "brand":       _column_or(df, "brand", "").fillna(""),
+            "description": df["name"],
+            "price":       _column_or(df, "price", None),
+            "categories":  classifiers_list.map(
+                lambda cls: "; ".join(
+                    self._NEW_FORMAT_CLASSIFIER_TO_CATEGORY[c]
+                    for c in cls
+                    if c in self._NEW_FORMAT_CLASSIFIER_TO_CATEGORY
+                )
+            ),
+            "classifier":  classifiers_list.map(lambda cls: cls[0] if cls else ""),
+            # Synthesize search_keyword from trailing content words of the product name.
+            # This restores the 0.15 * score_keyword fuzzy score contribution that the
+            # old catalog provided via its explicit search_keyword column.
+            "search_keyword": df["name"].map(self._synthesize_search_keyword),
+            "size":        _column_or(df, "size", "").fillna(""),
+            "image_url":   _column_or(df, "image", "").fillna(""),
+            "store_ids":   _column_or(df, "store_id", "").fillna(""),
+        })
 
     def _adapt_priced_catalog_format(self, df: pd.DataFrame) -> pd.DataFrame:
         """Convert Format C catalog (name/classifier string/search_keyword/price/store_ids)
@@ -995,19 +1449,19 @@ class IngredientMatcher:
           - 'image_url'      → product image URL
           - 'brand'          → brand name
         """
-        out = pd.DataFrame()
-        out["productId"]      = df.get("productId", pd.Series(range(len(df))))
-        out["brand"]          = df.get("brand", pd.Series([""] * len(df))).fillna("")
-        out["description"]    = df["name"]
-        out["categories"]     = df.get("categories", pd.Series([""] * len(df))).fillna("")
-        out["classifier"]     = df.get("classifier", pd.Series([""] * len(df))).fillna("")
-        out["search_keyword"] = df.get("search_keyword", pd.Series([""] * len(df))).fillna("")
-        out["price"]          = df.get("price", pd.Series([None] * len(df)))
-        out["size"]           = df.get("size", pd.Series([""] * len(df))).fillna("")
-        out["image_url"]      = df.get("image_url", pd.Series([""] * len(df))).fillna("")
-        out["store_ids"]      = df.get("store_ids", pd.Series([""] * len(df))).fillna("")
-        out["upc"]            = df.get("upc", pd.Series([""] * len(df))).fillna("")
-        return out
+        return pd.DataFrame({
+            "productId":      _column_or(df, "productId", range(len(df))),
+            "brand":          _column_or(df, "brand", "").fillna(""),
+            "description":    df["name"],
+            "categories":     _column_or(df, "categories", "").fillna(""),
+            "classifier":     _column_or(df, "classifier", "").fillna(""),
+            "search_keyword": _column_or(df, "search_keyword", "").fillna(""),
+            "price":          _column_or(df, "price", None),
+            "size":           _column_or(df, "size", "").fillna(""),
+            "image_url":      _column_or(df, "image_url", "").fillna(""),
+            "store_ids":      _column_or(df, "store_ids", "").fillna(""),
+            "upc":            _column_or(df, "upc", "").fillna(""),
+        })
 
     def _adapt_scraped_catalog_format(self, df: pd.DataFrame) -> pd.DataFrame:
         """
@@ -1015,117 +1469,177 @@ class IngredientMatcher:
         Schema: id, taxonomy, store, name, price (numeric), price_raw,
                 price_unit, quantity, image_url, description, out_of_stock
         """
-        out = pd.DataFrame()
-        out["productId"]      = df["id"]
-        out["description"]    = df["name"]
-        out["brand"]          = df.get("store", pd.Series([""] * len(df))).fillna("")
-        out["categories"]     = df.get("taxonomy", pd.Series([""] * len(df))).fillna("")
-        out["classifier"]     = df.get("taxonomy", pd.Series([""] * len(df))).fillna("")
-        out["search_keyword"] = df.get("taxonomy", pd.Series([""] * len(df))).fillna("")
-        out["size"]           = df.get("quantity", pd.Series([""] * len(df))).fillna("")
-        out["image_url"]      = df.get("image_url", pd.Series([""] * len(df))).fillna("")
-        out["store_ids"]      = df.get("store", pd.Series([""] * len(df))).fillna("")
-        out["price_raw"]      = df.get("price_raw", pd.Series([""] * len(df))).fillna("")
-        # price is already a single numeric — store as both price (for parse_min_price)
-        # and min_price (direct use). parse_min_price handles plain "1.79" correctly.
-        _price = df.get("price", pd.Series([""] * len(df))).fillna("").astype(str)
-        out["price"]          = _price
-        out["min_price"]      = pd.to_numeric(_price, errors="coerce")
-        return out
+        taxonomy = _column_or(df, "taxonomy", "").fillna("")
+        store = _column_or(df, "store", "").fillna("")
+        return pd.DataFrame({
+            "productId":      df["id"],
+            "description":    df["name"],
+            "brand":          store,
+            "categories":     taxonomy,
+            "classifier":     taxonomy,
+            "search_keyword": taxonomy,
+            "size":           _column_or(df, "quantity", "").fillna(""),
+            "image_url":      _column_or(df, "image_url", "").fillna(""),
+            "store_ids":      store,
+            "price_raw":      _column_or(df, "price_raw", "").fillna(""),
+            # price is already a single numeric; _prepare_catalog derives min_price
+            # from it (parse_min_price handles plain "1.79" correctly).
+            "price":          _column_or(df, "price", "").fillna("").astype(str),
+        })
 
     # ------------------------------------------------------------------
     # V5: inverted index — built once at load time, O(1) per token lookup
     # ------------------------------------------------------------------
 
-    def _build_index(self) -> Tuple[Dict[str, Set[int]], Dict[str, Set[int]]]:
+    def _build_index(self) -> Tuple[Dict[str, np.ndarray], Dict[str, np.ndarray]]:
         """
         Build two lookup structures at load time so _prefilter_candidates
         never scans the full dataframe with per-row regex.
 
-        _index        : exact token  -> set of positional row indices (int)
-        _prefix_index : 4-char prefix -> set of positional row indices (int)
+        _index        : exact token  -> sorted int32 array of positional row indices
+        _prefix_index : 4-char prefix -> sorted int32 array of positional row indices
                         (fallback for rare / morphologically-varied tokens)
 
         Both store *positional* indices (0..len(df)-1) so iloc retrieval
-        is fast and label-agnostic.
+        is fast and label-agnostic. Compact arrays rather than Python int sets
+        keep a large catalog's index small and let lookups union and count in
+        numpy.
         """
-        index: Dict[str, Set[int]] = defaultdict(set)
-        prefix_index: Dict[str, Set[int]] = defaultdict(set)
+        index: Dict[str, List[int]] = defaultdict(list)
+        prefix_index: Dict[str, List[int]] = defaultdict(list)
 
         for pos, combined in enumerate(self.df["combined_text"]):
             for tok in combined.split():
                 if len(tok) < 2:
                     continue
-                index[tok].add(pos)
+                # Rows are visited in order, so a repeat can only be at the end
+                postings = index[tok]
+                if not postings or postings[-1] != pos:
+                    postings.append(pos)
                 if len(tok) >= 4:
-                    prefix_index[tok[:4]].add(pos)
+                    postings = prefix_index[tok[:4]]
+                    if not postings or postings[-1] != pos:
+                        postings.append(pos)
 
-        return index, prefix_index
+        def as_arrays(lists: Dict[str, List[int]]) -> Dict[str, np.ndarray]:
+            return {key: np.array(positions, dtype=np.int32) for key, positions in lists.items()}
 
-    def _prefilter_candidates(self, normalized_ingredient: str) -> pd.DataFrame:
+        return as_arrays(index), as_arrays(prefix_index)
+
+    def _prefilter_candidates(self, normalized_ingredient: str) -> Tuple[pd.DataFrame, bool]:
+        """Returns (candidates, from_safety_net); from_safety_net is True when no
+        token hit the index and the candidates came from the full catalog."""
         tokens = important_tokens(normalized_ingredient)
 
         if not tokens:
-            return self.df.head(MAX_PREFILTER_ROWS).copy()
+            return self.df.head(MAX_PREFILTER_ROWS).copy(), False
 
         # -- 1. Exact-token lookup (O(tokens) dict hits) ----------------------
-        candidate_positions: Set[int] = set()
-        for tok in tokens:
-            candidate_positions |= self._index.get(tok, set())
+        postings = [self._index[tok] for tok in tokens if tok in self._index]
 
         # -- 2. Prefix fallback for tokens that had zero exact hits -----------
         # Catches plural/stem mismatches and lightly misspelled ingredients.
         for tok in tokens:
-            if not self._index.get(tok) and len(tok) >= 4:
-                candidate_positions |= self._prefix_index.get(tok[:4], set())
+            if tok not in self._index and len(tok) >= 4 and tok[:4] in self._prefix_index:
+                postings.append(self._prefix_index[tok[:4]])
 
         # -- 3. Full-catalog safety net ---------------------------------------
-        if not candidate_positions:
-            candidates = self.df.copy()
+        from_safety_net = not postings
+        if from_safety_net:
+            positions = np.arange(len(self.df))
         else:
-            candidates = self.df.iloc[sorted(candidate_positions)].copy()
+            positions = np.unique(np.concatenate(postings))
 
-        # -- 4. Drop obvious non-food categories ------------------------------
-        bad_mask = candidates["categories_norm"].str.contains(
-            "personal care|beauty|household|cleaning|pet|pharmacy",
-            regex=True,
-            na=False,
-        )
-        if (~bad_mask).sum() >= MIN_CANDIDATES_AFTER_BAD_FILTER:
-            candidates = candidates[~bad_mask].copy()
+        # -- 4. Drop obvious non-food categories (flag precomputed at load) ---
+        non_food = self._non_food_category[positions]
+        if (~non_food).sum() >= MIN_CANDIDATES_AFTER_BAD_FILTER:
+            positions = positions[~non_food]
 
-        # -- 5. Rank by token overlap, then alpha — pure set math, no regex --
-        token_set = set(tokens)
-        candidates["token_overlap_count"] = candidates["combined_text"].map(
-            lambda text: len(token_set & set(text.split()))
-        )
+        # -- 5. Rank by token overlap, then alpha — counted off the index -----
+        overlap = np.zeros(len(self.df), dtype=np.int64)
+        for tok in set(tokens):
+            hits = self._index.get(tok)
+            if hits is not None:
+                overlap[hits] += 1
 
-        candidates = candidates.sort_values(
-            by=["token_overlap_count", "description_norm"],
-            ascending=[False, True],
-        ).head(MAX_PREFILTER_ROWS)
+        # Stable sort on (overlap desc, description asc) done on the position
+        # arrays, so only the rows that survive the cut are copied out of df
+        overlap = overlap[positions]
+        order = np.lexsort((self._description_rank[positions], -overlap))[:MAX_PREFILTER_ROWS]
 
-        return candidates
+        candidates = self.df.iloc[positions[order]].copy()
+        candidates["token_overlap_count"] = overlap[order]
 
-    def _score_candidate(self, normalized_ingredient: str, row: pd.Series) -> Tuple[float, Dict[str, float]]:
-        desc = safe_str(row["description_norm"])
-        cats = safe_str(row["categories_norm"])
-        classifier = safe_str(row["classifier_norm"])
-        keyword = safe_str(row["search_keyword_norm"])
-        combined = safe_str(row["combined_text"])
+        return candidates, from_safety_net
 
-        ingredient_tokens = important_tokens(normalized_ingredient)
-        ingredient_token_set: Set[str] = set(ingredient_tokens)
+    def _fuzzy_scores(
+        self,
+        normalized_ingredient: str,
+        descs: List[Any],
+        combineds: List[Any],
+        keywords: List[Any],
+    ) -> List[Tuple[float, float, float, float, float]]:
+        """rapidfuzz scores for every candidate, one batched cdist call per scorer.
+
+        Per candidate: (desc ratio, desc partial_ratio, desc token_sort_ratio,
+        combined token_sort_ratio, keyword token_sort_ratio or 0.0 without a keyword).
+        """
+        descs = [safe_str(v) for v in descs]
+        combineds = [safe_str(v) for v in combineds]
+        keywords = [safe_str(v) for v in keywords]
+
+        def scores(scorer: Callable[..., float], choices: List[str]) -> np.ndarray:
+            return process.cdist([normalized_ingredient], choices, scorer=scorer, dtype=np.float64)[0]
+
+        keyword_scores = scores(fuzz.token_sort_ratio, keywords)
+        keyword_scores[np.array([not k for k in keywords], dtype=bool)] = 0.0
+        return list(zip(
+            scores(fuzz.ratio, descs).tolist(),
+            scores(fuzz.partial_ratio, descs).tolist(),
+            scores(fuzz.token_sort_ratio, descs).tolist(),
+            scores(fuzz.token_sort_ratio, combineds).tolist(),
+            keyword_scores.tolist(),
+        ))
+
+    # Catalog columns passed positionally to _score_candidate, in signature order
+    _SCORE_COLUMNS = (
+        "description_norm", "categories_norm", "classifier_norm", "search_keyword_norm",
+        "combined_text", "good_classifier", "desc_penalty_terms", "category_penalty_terms",
+    )
+    # Catalog columns copied into each match result
+    _RESULT_COLUMNS = (
+        "productId", "brand", "description", "categories", "classifier",
+        "search_keyword", "image_url", "size", "store_ids",
+    )
+
+    def _score_candidate(
+        self,
+        normalized_ingredient: str,
+        fuzzy_scores: Tuple[float, float, float, float, float],
+        desc: Any,
+        cats: Any,
+        classifier: Any,
+        keyword: Any,
+        combined: Any,
+        good_classifier: bool,
+        desc_terms: FrozenSet[str],
+        category_terms: FrozenSet[str],
+    ) -> Tuple[float, Dict[str, float]]:
+        desc = safe_str(desc)
+        cats = safe_str(cats)
+        classifier = safe_str(classifier)
+        keyword = safe_str(keyword)
+        combined = safe_str(combined)
+
+        (n_ingredient_tokens, ingredient_token_set, hints,
+         is_spirit, modifier_rules) = _ingredient_features(normalized_ingredient)
         combined_tokens = set(combined.split())
 
-        score_desc_ratio = float(fuzz.ratio(normalized_ingredient, desc))
-        score_desc_partial = float(fuzz.partial_ratio(normalized_ingredient, desc))
-        score_desc_token = float(fuzz.token_sort_ratio(normalized_ingredient, desc))
-        score_combined = float(fuzz.token_sort_ratio(normalized_ingredient, combined))
-        score_keyword = float(fuzz.token_sort_ratio(normalized_ingredient, keyword)) if keyword else 0.0
+        (score_desc_ratio, score_desc_partial, score_desc_token,
+         score_combined, score_keyword) = fuzzy_scores
 
         overlap = len(ingredient_token_set & combined_tokens)
-        n_tokens = max(len(ingredient_tokens), 1)
+        n_tokens = max(n_ingredient_tokens, 1)
         if n_tokens == 1:
             # Single-token ingredients: log scaling only — coverage ratio is trivially 1.0
             # and would inflate noise matches on common words (salt, pepper, butter, etc.)
@@ -1146,18 +1660,14 @@ class IngredientMatcher:
             exact_phrase_boost += 10.0
 
         category_boost = 0.0
-        cats_lower = cats.lower()
-        classifier_lower = classifier.lower()
-        classifier_upper = safe_str(row.get("classifier", "")).upper()
-        desc_lower = desc.lower()
+        # The *_norm columns are already lowercased by normalize_catalog_text
+        cats_lower = cats
+        classifier_lower = classifier
+        desc_lower = desc
 
-        if classifier_upper in GOOD_CLASSIFIERS:
+        if good_classifier:
             category_boost += 4.0
 
-        hints = set()
-        for token in ingredient_token_set:
-            hints |= INGREDIENT_CATEGORY_HINTS.get(token, set())
-
         for hint in hints:
             if hint in cats_lower:
                 category_boost += CATEGORY_BOOST_HINTS.get(hint, 0.0)
@@ -1165,7 +1675,7 @@ class IngredientMatcher:
                 category_boost += CATEGORY_BOOST_HINTS.get(hint, 0.0)
 
         # Spirit ingredients: penalise flavoured foods that use spirit words as flavouring
-        if ingredient_token_set & SPIRIT_TOKENS:
+        if is_spirit:
             if any(x in desc_lower for x in [
                 "bbq", "barbecue", "baked beans", "marinade", "seasoning",
                 "salami", "cashews", "pulled pork", "raisin", "ice cream",
@@ -1184,28 +1694,24 @@ class IngredientMatcher:
 
         # -- V5: opposite modifier penalty ------------------------------------
         modifier_penalty = 0.0
-        for modifier, (opposites, pen_value) in OPPOSITE_MODIFIER_PENALTIES.items():
-            if not _word_in(modifier, normalized_ingredient):
-                continue
+        for has_modifier, has_opposite, pen_value in modifier_rules:
             # Skip if the product description already confirms the same modifier
-            if _word_in(modifier, desc_lower):
+            if has_modifier(desc_lower):
                 continue
-            for opp in opposites:
-                if _word_in(opp, desc_lower):
-                    modifier_penalty += pen_value
-                    break
+            if has_opposite(desc_lower):
+                modifier_penalty += pen_value
         penalty += modifier_penalty
 
-        for bad_cat, penalty_value in BAD_CATEGORY_HINTS.items():
-            if bad_cat in cats_lower or bad_cat in classifier_lower:
-                penalty += penalty_value
+        # desc_terms / category_terms are precomputed at load time by _prepare_catalog
+        for bad_cat in category_terms.intersection(BAD_CATEGORY_HINTS):
+            penalty += BAD_CATEGORY_HINTS[bad_cat]
 
-        for bad_term, penalty_value in BAD_PRODUCT_TERMS.items():
-            if bad_term in desc_lower and bad_term not in normalized_ingredient:
-                penalty += penalty_value
+        for bad_term in desc_terms.intersection(BAD_PRODUCT_TERMS):
+            if bad_term not in normalized_ingredient:
+                penalty += BAD_PRODUCT_TERMS[bad_term]
 
-        for bad_term in PREPARED_FOOD_TERMS:
-            if bad_term in desc_lower and bad_term not in normalized_ingredient:
+        for bad_term in desc_terms & PREPARED_FOOD_TERMS:
+            if bad_term not in normalized_ingredient:
                 penalty += 8.0
 
         if "dip" in desc_lower and "dip" not in normalized_ingredient:
@@ -1735,78 +2241,60 @@ class IngredientMatcher:
         raw_ingredient: str,
         normalized: str,
         candidates: List[Dict[str, Any]],
-    ) -> List[Dict[str, Any]]:
+    ) -> Optional[List[Dict[str, Any]]]:
         """Call the Claude API to rerank fuzzy candidates.
 
-        Returns the reranked list.  On any failure (network, parse error,
-        invalid index) the original fuzzy-ranked list is returned unchanged.
+        Returns the reranked list, or None on any failure (network, parse error,
+        invalid index) — the caller then keeps the fuzzy ranking. Only replies
+        that rerank successfully are cached, so an unusable one is asked again.
         """
         if not candidates:
             return candidates
-
-        # Build a lean candidate list for the prompt — only what the LLM needs.
-        prompt_candidates = [
-            {
-                "index": i,
-                "description": c["description"],
-                "brand": c.get("brand", ""),
-                "category": c.get("categories", c.get("classifier", "")),
-                "fuzzy_score": c["score"],
-            }
-            for i, c in enumerate(candidates[:RERANKER_MAX_CANDIDATES])
-        ]
-
-        user_content = RERANKER_USER_TEMPLATE.format(
+        user_content = self._rerank_prompt(raw_ingredient, normalized, candidates)
+        cached = self._cached_reply(user_content)
+        if cached is not None:
+            reranked = self._apply_rerank_reply(candidates, cached)
+            if reranked is not None:
+                return reranked
+        text = self._reranker_reply(user_content)
+        reranked = self._apply_rerank_reply(candidates, text)
+        if reranked is not None:
+            self._store_reply(user_content, text)
+        return reranked
+
+    def _rerank_prompt(self, raw_ingredient: str, normalized: str, candidates: List[Dict[str, Any]]) -> str:
+        return RERANKER_USER_TEMPLATE.format(
             raw=raw_ingredient,
             normalized=normalized,
-            candidates_json=json.dumps(prompt_candidates, indent=2),
+            candidates_json=_compact_json(_prompt_candidates(candidates)),
         )
 
-        payload = json.dumps({
-            "model": RERANKER_MODEL,
-            "max_tokens": RERANKER_MAX_TOKENS,
-            "system": RERANKER_SYSTEM,
-            "messages": [{"role": "user", "content": user_content}],
-        }).encode("utf-8")
-
-        req = urllib.request.Request(
-            "https://api.anthropic.com/v1/messages",
-            data=payload,
-            headers={
-                "Content-Type": "application/json",
-                "x-api-key": self._api_key,
-                "anthropic-version": "2023-06-01",
-            },
-            method="POST",
-        )
-
-        try:
-            with urllib.request.urlopen(req, timeout=30) as resp:
-                body = json.loads(resp.read().decode("utf-8"))
-        except (urllib.error.URLError, json.JSONDecodeError) as exc:
-            # Network or parse failure — fall back silently
-            print(f"[reranker] API call failed: {exc}; using fuzzy ranking")
-            return candidates
-
-        # Extract text content from the response
-        try:
-            text = next(
-                block["text"]
-                for block in body.get("content", [])
-                if block.get("type") == "text"
-            )
-        except (StopIteration, KeyError):
-            print("[reranker] Unexpected response structure; using fuzzy ranking")
-            return candidates
-
-        # Strip accidental markdown fences
-        text = re.sub(r"^```(?:json)?\s*|\s*```$", "", text.strip())
-
-        try:
-            parsed = json.loads(text)
-        except json.JSONDecodeError:
+    def _apply_rerank_reply(
+        self,
+        candidates: List[Dict[str, Any]],
+        text: Optional[str],
+    ) -> Optional[List[Dict[str, Any]]]:
+        """Rerank candidates per the reply text; None when the reply is missing
+        or unusable."""
+        if text is None:
+            return None
+
+        parsed = _parse_json_object(text)
+        if parsed is None:
             print(f"[reranker] Could not parse JSON: {text!r}; using fuzzy ranking")
-            return candidates
+            return None
+        return self._apply_rerank_choice(candidates, parsed)
+
+    def _apply_rerank_choice(
+        self,
+        candidates: List[Dict[str, Any]],
+        parsed: Any,
+    ) -> Optional[List[Dict[str, Any]]]:
+        """Rerank candidates per one parsed {"choice": ..., "reason": ...} object;
+        None when the object is unusable."""
+        if not isinstance(parsed, dict):
+            print(f"[reranker] Unexpected reply entry {parsed!r}; using fuzzy ranking")
+            return None
 
         choice = parsed.get("choice")
         reason = parsed.get("reason", "")
@@ -1816,20 +2304,328 @@ class IngredientMatcher:
             return []
 
         # Validate the choice index
-        if not isinstance(choice, int) or not (0 <= choice < len(prompt_candidates)):
+        n_prompt_candidates = min(len(candidates), RERANKER_MAX_CANDIDATES)
+        if not isinstance(choice, int) or not (0 <= choice < n_prompt_candidates):
             print(f"[reranker] Invalid choice index {choice!r}; using fuzzy ranking")
-            return candidates
+            return None
+
+        return _promote_candidate(candidates, choice, reason)
+
+    def _message_params(self, user_content: str, max_tokens: int = RERANKER_MAX_TOKENS) -> Dict[str, Any]:
+        return {
+            "model": RERANKER_MODEL,
+            "max_tokens": max_tokens,
+            "system": RERANKER_SYSTEM,
+            "messages": [{"role": "user", "content": user_content}],
+        }
+
+    @staticmethod
+    def _reply_key(user_content: str) -> str:
+        return ReplyCache.key(
+            version=RERANKER_CACHE_VERSION,
+            model=RERANKER_MODEL,
+            system=RERANKER_SYSTEM,
+            prompt=user_content,
+        )
+
+    def _cached_reply(self, user_content: str) -> Optional[str]:
+        if self._reply_cache is None:
+            return None
+        return self._reply_cache.get(self._reply_key(user_content))
+
+    def _store_reply(self, user_content: str, text: str) -> None:
+        if self._reply_cache is not None:
+            self._reply_cache.put(self._reply_key(user_content), text)
+
+    def _reranker_reply(self, user_content: str, max_tokens: int = RERANKER_MAX_TOKENS) -> Optional[str]:
+        """Return the reranker's reply text for a prompt, or None on failure.
+        Callers cache the reply once it has reranked successfully."""
+        return self._client.message_text(self._message_params(user_content, max_tokens))
+
+    def _rerank_batch(
+        self,
+        jobs: List[Tuple[str, str, List[Dict[str, Any]]]],
+    ) -> List[Optional[List[Dict[str, Any]]]]:
+        """Rerank jobs through one Message Batches request. Cached prompts are
+        answered locally; None for jobs without a usable result."""
+        results: List[Optional[List[Dict[str, Any]]]] = [None] * len(jobs)
+        prompts: Dict[int, str] = {}
+        requests = []
+        for i, (raw, normalized, candidates) in enumerate(jobs):
+            if not candidates:
+                results[i] = candidates
+                continue
+            prompts[i] = self._rerank_prompt(raw, normalized, candidates)
+            cached = self._cached_reply(prompts[i])
+            if cached is not None:
+                results[i] = self._apply_rerank_reply(candidates, cached)
+            if results[i] is None:
+                requests.append({"custom_id": f"job-{i}", "params": self._message_params(prompts[i])})
+
+        if requests:
+            batch_replies = self._client.run_message_batch(requests)
+            for request in requests:
+                i = int(request["custom_id"].split("-", 1)[1])
+                text = batch_replies.get(request["custom_id"])
+                results[i] = self._apply_rerank_reply(jobs[i][2], text)
+                if results[i] is not None:
+                    self._store_reply(prompts[i], text)
+            failed = len(requests) - len(batch_replies)
+            if failed:
+                print(f"[reranker] {failed}/{len(requests)} batch requests failed; using fuzzy ranking for those")
+
+        return results
 
-        # Promote the chosen candidate to position 0; keep the rest after
-        chosen = {**candidates[choice], "reranker_reason": reason, "reranker_choice": True}
-        rest = [
-            {**c, "reranker_choice": False}
-            for i, c in enumerate(candidates)
-            if i != choice
+    def _rerank_all(
+        self,
+        jobs: List[Tuple[str, str, List[Dict[str, Any]]]],
+    ) -> List[Optional[List[Dict[str, Any]]]]:
+        """Rerank several (raw, normalized, candidates) jobs.
+
+        Returns the reranked list per job, or None where the rerank failed
+        (network, retries exhausted, unusable reply) and the job keeps its
+        fuzzy order. With rerank_neighbors enabled, jobs that can reuse an
+        earlier pick are resolved locally and only the rest go to the API.
+        """
+        if not self._rerank_neighbors:
+            return self._dispatch_reranks(jobs)
+
+        results: List[Optional[List[Dict[str, Any]]]] = [
+            self._reuse_neighbor_decision(raw, candidates)
+            for raw, _, candidates in jobs
         ]
-        return [chosen] + rest
+        pending = [i for i, result in enumerate(results) if result is None]
+        for i, reranked in zip(pending, self._dispatch_reranks([jobs[i] for i in pending])):
+            results[i] = reranked
+            if reranked and reranked[0].get("reranker_choice"):
+                self._remember_decision(jobs[i][0], reranked[0]["productId"])
+        return results
+
+    @staticmethod
+    def _neighbor_key(raw_ingredient: str) -> str:
+        """The raw line's words, lowercased and sorted. Keyed on the raw text rather
+        than the normalized form, which drops details the reranker tells apart
+        ("1%" vs "2%" milk fat, "no salt added")."""
+        return " ".join(sorted(utils.default_process(raw_ingredient).split()))
+
+    def _remember_decision(self, raw_ingredient: str, product_id: str) -> None:
+        if len(self._rerank_decisions) >= RERANKER_NEIGHBOR_CACHE_SIZE:
+            if not self._rerank_decisions:
+                return
+            del self._rerank_decisions[next(iter(self._rerank_decisions))]
+        self._rerank_decisions[self._neighbor_key(raw_ingredient)] = (product_id, raw_ingredient)
+
+    def _reuse_neighbor_decision(
+        self,
+        raw_ingredient: str,
+        candidates: List[Dict[str, Any]],
+    ) -> Optional[List[Dict[str, Any]]]:
+        """Promote the product picked for an already reranked line with the same
+        words if it is among these candidates; None when there is none."""
+        decision = self._rerank_decisions.get(self._neighbor_key(raw_ingredient))
+        if decision is None:
+            return None
+        product_id, neighbor = decision
+        for i, candidate in enumerate(candidates[:RERANKER_MAX_CANDIDATES]):
+            if candidate["productId"] == product_id:
+                return _promote_candidate(
+                    candidates, i, f'Same product the reranker picked for "{neighbor}".'
+                )
+        return None
+
+    def close(self) -> None:
+        """Stop the reranker worker threads and close their kept-alive sockets.
+        The matcher stays usable; later calls start them again."""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+        self._client.close()
+
+    def _dispatch_reranks(
+        self,
+        jobs: List[Tuple[str, str, List[Dict[str, Any]]]],
+    ) -> List[Optional[List[Dict[str, Any]]]]:
+        """Each reranker request is a blocking HTTP round-trip, so requests are run
+        on worker threads with at most RERANKER_MAX_CONCURRENCY in flight. Jobs go
+        RERANKER_PACK_SIZE to a request; with reranker_batch, multi-job calls go
+        through _rerank_batch instead. None for jobs whose rerank failed."""
+        if self._reranker_batch and len(jobs) > 1:
+            return self._rerank_batch(jobs)
+        if RERANKER_PACK_SIZE > 1 and len(jobs) > 1:
+            packs = [jobs[i:i + RERANKER_PACK_SIZE] for i in range(0, len(jobs), RERANKER_PACK_SIZE)]
+            reranked_packs = self._run_in_threads(self._rerank_pack, [(pack,) for pack in packs])
+            return [reranked for pack in reranked_packs for reranked in pack]
+        return self._run_in_threads(self._rerank, jobs)
+
+    def _run_in_threads(self, func: Callable[..., Any], arg_tuples: List[Tuple[Any, ...]]) -> List[Any]:
+        """[func(*args) for args in arg_tuples], run concurrently on the matcher's
+        RERANKER_MAX_CONCURRENCY worker threads."""
+        if len(arg_tuples) <= 1:
+            return [func(*args) for args in arg_tuples]
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=RERANKER_MAX_CONCURRENCY, thread_name_prefix="reranker"
+            )
+        return list(self._executor.map(lambda args: func(*args), arg_tuples))
+
+    def _rerank_pack(
+        self,
+        pack: List[Tuple[str, str, List[Dict[str, Any]]]],
+    ) -> List[Optional[List[Dict[str, Any]]]]:
+        """Rerank several jobs with one request (array-in / array-out).
+
+        Jobs with a usable cached reply are answered locally and only the misses
+        are packed; each usable packed result is cached under its job's single
+        prompt. Falls back to one request per job if the reply doesn't hold one
+        entry per job. None for jobs whose rerank failed.
+        """
+        results: List[Optional[List[Dict[str, Any]]]] = [None] * len(pack)
+        misses = []
+        for i, (raw, normalized, candidates) in enumerate(pack):
+            if not candidates:
+                results[i] = candidates
+                continue
+            prompt = self._rerank_prompt(raw, normalized, candidates)
+            cached = self._cached_reply(prompt)
+            if cached is not None:
+                results[i] = self._apply_rerank_reply(candidates, cached)
+            if results[i] is None:
+                misses.append((i, prompt))
+
+        if len(misses) == 1:
+            i, _ = misses[0]
+            results[i] = self._rerank(*pack[i])
+        elif misses:
+            positions = [i for i, _ in misses]
+            prompts = [prompt for _, prompt in misses]
+            reranked = self._rerank_uncached([pack[i] for i in positions], prompts)
+            for i, candidates in zip(positions, reranked):
+                results[i] = candidates
+        return results
+
+    def _rerank_uncached(
+        self,
+        jobs: List[Tuple[str, str, List[Dict[str, Any]]]],
+        prompts: List[str],
+    ) -> List[Optional[List[Dict[str, Any]]]]:
+        """Send jobs (with their single prompts, used as cache keys) as one packed request."""
+        items = "\n\n".join(
+            RERANKER_PACKED_ITEM_TEMPLATE.format(
+                number=number,
+                raw=raw,
+                normalized=normalized,
+                candidates_json=_compact_json(_prompt_candidates(candidates)),
+            )
+            for number, (raw, normalized, candidates) in enumerate(jobs, start=1)
+        )
+        user_content = RERANKER_PACKED_USER_TEMPLATE.format(count=len(jobs), items=items)
+
+        text = self._reranker_reply(user_content, max_tokens=RERANKER_MAX_TOKENS * len(jobs))
+        if text is None:
+            return [None] * len(jobs)
+
+        parsed = _parse_json_object(text)
+        entries = parsed.get("results") if parsed is not None else None
+        if not isinstance(entries, list) or len(entries) != len(jobs):
+            print(f"[reranker] Packed reply did not hold {len(jobs)} results; reranking one by one")
+            return [self._rerank(*job) for job in jobs]
+
+        reranked = []
+        for (_, _, candidates), prompt, entry in zip(jobs, prompts, entries):
+            result = self._apply_rerank_choice(candidates, entry)
+            if result is not None:
+                self._store_reply(prompt, _compact_json(entry))
+            reranked.append(result)
+        return reranked
 
     def match_ingredient(self, raw_ingredient: str, top_k: int = TOP_K) -> Dict[str, Any]:
+        return self._match_parts([raw_ingredient], top_k=top_k)[0]
+
+    def _match_parts(self, parts: List[str], top_k: int) -> List[Dict[str, Any]]:
+        """Match each part independently. Fuzzy scoring runs first for every part so
+        that all reranker calls can be dispatched together."""
+        # Identical parts (the same line in several recipes, a repeated "salt", ...)
+        # are scored and reranked once; later positions get their own copy.
+        unique_parts = list(dict.fromkeys(parts))
+        if len(unique_parts) < len(parts):
+            by_part = dict(zip(unique_parts, self._match_parts(unique_parts, top_k)))
+            seen: Set[str] = set()
+            results = []
+            for part in parts:
+                result = by_part[part]
+                results.append(copy.deepcopy(result) if part in seen else result)
+                seen.add(part)
+            return results
+
+        new_parts = [part for part in parts if (part, top_k) not in self._match_cache]
+        fresh: Dict[str, Dict[str, Any]] = {}
+        unreranked: Set[str] = set()
+        if new_parts:
+            matched, unreranked = self._match_new_parts(new_parts, top_k)
+            fresh = dict(zip(new_parts, matched))
+        results = [
+            copy.deepcopy(fresh[part] if part in fresh else self._match_cache[(part, top_k)])
+            for part in parts
+        ]
+        for part, result in fresh.items():
+            # A failed rerank's fuzzy fallback isn't memoized, so the part is
+            # reranked again next time (the reply cache likewise skips failures)
+            if part in unreranked:
+                continue
+            if len(self._match_cache) >= MATCH_CACHE_SIZE:
+                if not self._match_cache:
+                    break
+                del self._match_cache[next(iter(self._match_cache))]
+            self._match_cache[(part, top_k)] = result
+        return results
+
+    def _match_new_parts(self, parts: List[str], top_k: int) -> Tuple[List[Dict[str, Any]], Set[str]]:
+        """Score, rerank and finalize distinct parts that aren't in the match cache.
+        Also returns the parts whose rerank failed and kept their fuzzy order."""
+        ranked = [self._rank_candidates(part) for part in parts]
+        unreranked: Set[str] = set()
+
+        # ── LLM reranker ─────────────────────────────────────────────────────
+        # Pass the top candidates to Claude, which can override the fuzzy ranking.
+        # Runs even when fuzzy would have returned "no match" — the LLM may
+        # confirm that nothing fits (empty return) or pick a candidate the fuzzy
+        # scorer underranked. The exception is an ingredient that hit nothing in
+        # the token index: when the safety-net probe in _rank_candidates finds no
+        # row reaching MIN_TOP_MATCH_SCORE, it has no candidates and is not sent.
+        if self.use_reranker:
+            pending = [
+                i for i, (early, _, _, scored_results) in enumerate(ranked)
+                if early is None and scored_results
+                and not (self._skip_confident_reranks and self._is_confident(scored_results))
+            ]
+            reranked = self._rerank_all([ranked[i][1:] for i in pending])
+            for i, scored_results in zip(pending, reranked):
+                if scored_results is None:
+                    unreranked.add(parts[i])
+                    continue
+                ranked[i] = (None, ranked[i][1], ranked[i][2], scored_results)
+
+        return [
+            early if early is not None
+            else self._finalize_match(raw, normalized, scored_results, top_k)
+            for early, raw, normalized, scored_results in ranked
+        ], unreranked
+
+    @staticmethod
+    def _is_confident(scored_results: List[Dict[str, Any]]) -> bool:
+        """True when the fuzzy top match is strong and clearly ahead of the next."""
+        top = scored_results[0]["score"]
+        runner_up = scored_results[1]["score"] if len(scored_results) > 1 else 0.0
+        return top >= RERANKER_CONFIDENT_SCORE and top - runner_up >= RERANKER_CONFIDENT_MARGIN
+
+    def _rank_candidates(
+        self, raw_ingredient: str
+    ) -> Tuple[Optional[Dict[str, Any]], str, str, List[Dict[str, Any]]]:
+        """Fuzzy stage of matching.
+
+        Returns (early_result, raw, normalized, scored_results). early_result is
+        the final result when the ingredient is skipped before scoring.
+        """
         raw_ingredient = preprocess_ingredient(raw_ingredient)
 
         skip, reason = should_skip_ingredient(raw_ingredient)
@@ -1840,7 +2636,7 @@ class IngredientMatcher:
                 "skipped": True,
                 "skip_reason": reason,
                 "matches": [],
-            }
+            }, raw_ingredient, "", []
 
         normalized = normalize_ingredient(raw_ingredient)
 
@@ -1851,28 +2647,58 @@ class IngredientMatcher:
                 "skipped": True,
                 "skip_reason": "empty after normalization",
                 "matches": [],
-            }
-
-        candidates = self._prefilter_candidates(normalized)
+            }, raw_ingredient, "", []
+
+        candidates, from_safety_net = self._prefilter_candidates(normalized)
+
+        # Nothing in the index matched, so the candidates are arbitrary catalog
+        # rows. Fully score only the closest few by description partial_ratio;
+        # if not even one of those is a usable match, give up rather than
+        # scoring the rest — the reranker never sees such an ingredient either.
+        if from_safety_net and len(candidates) > SAFETY_NET_PROBE_ROWS:
+            closeness = process.cdist(
+                [normalized], candidates["description_norm"].tolist(),
+                scorer=fuzz.partial_ratio, dtype=np.float64,
+            )[0]
+            probe_rows = np.sort(np.argsort(-closeness, kind="stable")[:SAFETY_NET_PROBE_ROWS])
+            probe = self._score_candidates(normalized, candidates.iloc[probe_rows])
+            if not probe or probe[0]["score"] < MIN_TOP_MATCH_SCORE:
+                return None, raw_ingredient, normalized, []
+
+        return None, raw_ingredient, normalized, self._score_candidates(normalized, candidates)
+
+    def _score_candidates(self, normalized: str, candidates: pd.DataFrame) -> List[Dict[str, Any]]:
+        """Score prefiltered candidates; results above MIN_CANDIDATE_SCORE, best first."""
+        # Walk the candidates as parallel column lists instead of building a
+        # pd.Series per row with iterrows; result fields are only read for
+        # candidates that clear the score floor.
+        n_candidates = len(candidates)
+        score_columns = [candidates[col].tolist() for col in self._SCORE_COLUMNS]
+        result_columns = {
+            col: candidates[col].tolist() if col in candidates.columns else [""] * n_candidates
+            for col in self._RESULT_COLUMNS
+        }
+        prices = candidates["price"].tolist() if "price" in candidates.columns else [""] * n_candidates
+        min_prices = candidates["min_price"].tolist()
+
+        columns = dict(zip(self._SCORE_COLUMNS, score_columns))
+        fuzzy_scores = self._fuzzy_scores(
+            normalized,
+            columns["description_norm"],
+            columns["combined_text"],
+            columns["search_keyword_norm"],
+        )
 
         scored_results = []
-        for _, row in candidates.iterrows():
-            score, breakdown = self._score_candidate(normalized, row)
+        for i, fields in enumerate(zip(*score_columns)):
+            score, breakdown = self._score_candidate(normalized, fuzzy_scores[i], *fields)
             if score < MIN_CANDIDATE_SCORE:
                 continue
 
-            _price_raw = safe_str(row.get("price", ""))
-            _min_price = parse_min_price(_price_raw)
+            _price_raw = safe_str(prices[i])
+            _min_price = None if math.isnan(min_prices[i]) else min_prices[i]
             scored_results.append({
-                "productId": safe_str(row.get("productId", "")),
-                "brand": safe_str(row.get("brand", "")),
-                "description": safe_str(row.get("description", "")),
-                "categories": safe_str(row.get("categories", "")),
-                "classifier": safe_str(row.get("classifier", "")),
-                "search_keyword": safe_str(row.get("search_keyword", "")),
-                "image_url": safe_str(row.get("image_url", "")),
-                "size": safe_str(row.get("size", "")),
-                "store_ids": safe_str(row.get("store_ids", "")),
+                **{col: safe_str(values[i]) for col, values in result_columns.items()},
                 "price_raw": _price_raw,
                 "min_price": _min_price,
                 "score": round(score, 2),
@@ -1881,16 +2707,15 @@ class IngredientMatcher:
             })
 
         scored_results.sort(key=lambda x: x["score"], reverse=True)
-        scored_results = self._dedupe_matches(scored_results)
-
-        # ── LLM reranker ─────────────────────────────────────────────────────
-        # Pass the top candidates to Claude, which can override the fuzzy ranking.
-        # Runs even when fuzzy would have returned "no match" — the LLM may
-        # confirm that nothing fits (empty return) or pick a candidate the fuzzy
-        # scorer underranked.
-        if self.use_reranker and scored_results:
-            scored_results = self._rerank(raw_ingredient, normalized, scored_results)
+        return self._dedupe_matches(scored_results)
 
+    def _finalize_match(
+        self,
+        raw_ingredient: str,
+        normalized: str,
+        scored_results: List[Dict[str, Any]],
+        top_k: int,
+    ) -> Dict[str, Any]:
         if not scored_results:
             return {
                 "raw_ingredient": raw_ingredient,
@@ -1941,18 +2766,43 @@ class IngredientMatcher:
         }
 
     def match_ingredients(self, ingredients: List[str], top_k: int = TOP_K) -> List[Dict[str, Any]]:
-        results = []
+        return self.match_ingredient_lists([ingredients], top_k=top_k)[0]
+
+    def match_ingredient_lists(
+        self,
+        ingredient_lists: List[List[str]],
+        top_k: int = TOP_K,
+    ) -> List[List[Dict[str, Any]]]:
+        """match_ingredients for many lists (e.g. many recipes) at once. Every part
+        of every list is reranked in one dispatch — with reranker_batch, a single
+        Message Batch for the whole workload."""
+        plans = []
+        parts: List[str] = []
+        for ingredients in ingredient_lists:
+            plans.append(self._plan_ingredients(ingredients, parts))
+
+        matched = self._match_parts(parts, top_k=top_k)
+        return [self._assemble_matches(plan, matched) for plan in plans]
+
+    def _plan_ingredients(
+        self,
+        ingredients: List[str],
+        parts: List[str],
+    ) -> List[Tuple[Optional[Dict[str, Any]], str, List[int]]]:
+        """Expand each ingredient into the parts to match, appending them to parts,
+        so that every part can be scored (and reranked) in one _match_parts call."""
+        plan: List[Tuple[Optional[Dict[str, Any]], str, List[int]]] = []
 
         for ingredient in ingredients:
             ingredient = preprocess_ingredient(ingredient)
             if not ingredient:
-                results.append({
+                plan.append(({
                     "raw_ingredient": "",
                     "normalized_ingredient": "",
                     "skipped": True,
                     "skip_reason": "empty after preprocessing",
                     "matches": [],
-                })
+                }, "", []))
                 continue
 
             alternatives = split_alternative_ingredients(ingredient)
@@ -1971,19 +2821,30 @@ class IngredientMatcher:
                 seen.add(key)
                 deduped_parts.append(part)
 
-            if len(deduped_parts) == 1:
-                results.append(self.match_ingredient(deduped_parts[0], top_k=top_k))
-            else:
-                option_results = []
-                for part in deduped_parts:
-                    option_results.append(self.match_ingredient(part, top_k=top_k))
+            positions = list(range(len(parts), len(parts) + len(deduped_parts)))
+            parts.extend(deduped_parts)
+            plan.append((None, ingredient, positions))
+
+        return plan
 
+    @staticmethod
+    def _assemble_matches(
+        plan: List[Tuple[Optional[Dict[str, Any]], str, List[int]]],
+        matched: List[Dict[str, Any]],
+    ) -> List[Dict[str, Any]]:
+        results = []
+        for done, ingredient, positions in plan:
+            if done is not None:
+                results.append(done)
+            elif len(positions) == 1:
+                results.append(matched[positions[0]])
+            else:
                 results.append({
                     "raw_ingredient": ingredient,
                     "normalized_ingredient": "",
                     "skipped": False,
                     "skip_reason": "",
-                    "alternatives": option_results,
+                    "alternatives": [matched[i] for i in positions],
                     "matches": [],
                 })
 
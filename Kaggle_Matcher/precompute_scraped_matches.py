@@ -8,18 +8,24 @@ Run ONCE (safe to re-run — skips already-processed recipes):
     cd Kaggle_Kroger
     source .venv/bin/activate
     caffeinate -is python precompute_scraped_matches.py
+
+To rerank matches with Claude through the (half-price) Message Batches API:
+    RERANKER_BATCH=1 ANTHROPIC_API_KEY=... caffeinate -is python precompute_scraped_matches.py
 """
 
-import urllib.request
 import urllib.parse
-import json
+import multiprocessing
+import os
+import random
 import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from itertools import groupby
+from typing import Optional
 import pandas as pd
+from Kaggle_Kroger.http_util import HTTPStatusError, KeepAliveHTTPS, json_dumps, json_loads
 from Kaggle_Kroger.ingredient_matcher import (
     IngredientMatcher,
     parse_ingredient_list_string,
-    normalize_catalog_text,
-    normalize_spaces,
 )
 
 SUPABASE_URL = "https://vpmxdkrwqxgullnducey.supabase.co"
@@ -32,153 +38,174 @@ HEADERS = {
     "Prefer":        "return=minimal",
 }
 
+# Keep-alive connection to Supabase (one socket per thread), so paging and
+# uploads don't pay a fresh TLS handshake on every request
+SUPABASE = KeepAliveHTTPS(urllib.parse.urlsplit(SUPABASE_URL).netloc, timeout=60)
+
+
+def retry_wait(backoff: float, attempt: int) -> float:
+    """Exponential backoff with jitter: about backoff, 2x, 4x, ... seconds."""
+    return backoff * 2 ** attempt * random.uniform(0.5, 1.0)
+
 
 def sb_get(table: str, params: dict, retries=5, backoff=3.0) -> list:
-    url = f"{SUPABASE_URL}/rest/v1/{table}?{urllib.parse.urlencode(params)}"
+    path = f"/rest/v1/{table}?{urllib.parse.urlencode(params)}"
     last_err = None
     for attempt in range(retries):
         try:
-            req = urllib.request.Request(url, headers=HEADERS)
-            with urllib.request.urlopen(req, timeout=60) as r:
-                return json.loads(r.read())
+            return json_loads(SUPABASE.request("GET", path, headers=HEADERS))
         except Exception as e:
             last_err = e
-            wait = backoff * (attempt + 1)
+            wait = retry_wait(backoff, attempt)
             print(f"  ⚠️  Fetch failed (attempt {attempt+1}/{retries}): {e}")
             time.sleep(wait)
     raise last_err
 
 
-def sb_post(table: str, rows: list, retries=5, backoff=3.0):
+# Rows per INSERT request (approximately — chunks only break between recipes).
+# Halved automatically if Supabase answers 413.
+POST_CHUNK_ROWS = 2000
+
+
+def sb_post(table: str, rows: list, retries=5, backoff=3.0, chunk_rows=POST_CHUNK_ROWS):
+    """Insert rows in chunks of up to chunk_rows, halving the chunk on 413 Payload Too Large.
+
+    Chunks are cut only between recipes, so each recipe's rows go in one
+    all-or-nothing INSERT. A failed upload can't leave a recipe half inserted,
+    which the re-run would then skip as already done.
+    """
+    recipes = [list(group) for _, group in groupby(rows, key=lambda row: row["recipe_id"])]
+    start = 0
+    while start < len(recipes):
+        end, size = start + 1, len(recipes[start])
+        while end < len(recipes) and size + len(recipes[end]) <= chunk_rows:
+            size += len(recipes[end])
+            end += 1
+        chunk = [row for recipe in recipes[start:end] for row in recipe]
+        try:
+            sb_post_chunk(table, chunk, retries, backoff)
+        except HTTPStatusError as e:
+            if e.status != 413 or end - start == 1:
+                raise  # a single recipe's rows can't be split without breaking that guarantee
+            chunk_rows = max(1, size // 2)
+            print(f"  ⚠️  Payload too large — retrying with {chunk_rows} rows per request")
+            continue
+        start = end
+
+
+def sb_post_chunk(table: str, rows: list, retries=5, backoff=3.0):
     if not rows:
         return
-    data = json.dumps(rows).encode()
+    data = json_dumps(rows)
     last_err = None
     for attempt in range(retries):
         try:
-            req = urllib.request.Request(
-                f"{SUPABASE_URL}/rest/v1/{table}",
-                data=data, headers=HEADERS, method="POST"
-            )
-            with urllib.request.urlopen(req, timeout=60) as r:
-                return r.status
+            SUPABASE.request("POST", f"/rest/v1/{table}", body=data, headers=HEADERS)
+            return
         except Exception as e:
+            if isinstance(e, HTTPStatusError) and e.status == 413:
+                raise  # resending the same payload can't help; sb_post splits it
             last_err = e
-            wait = backoff * (attempt + 1)
+            wait = retry_wait(backoff, attempt)
             print(f"  ⚠️  Upload failed (attempt {attempt+1}/{retries}): {e}")
             time.sleep(wait)
     raise last_err
 
 
-def fetch_all(table: str, columns: str, order: str) -> list:
-    rows, offset = [], 0
+PAGE_SIZE = 1000
+
+
+def iter_pages(table: str, columns: str, order: str):
+    """Yield a table PAGE_SIZE rows at a time, fetching each page only when needed."""
+    offset = 0
     while True:
         batch = sb_get(table, {
-            "select": columns, "limit": 1000,
+            "select": columns, "limit": PAGE_SIZE,
             "offset": offset, "order": order,
         })
-        rows.extend(batch)
-        if len(batch) < 1000:
-            break
-        offset += 1000
-    return rows
-
-
-# ── Step 1: Load scraped_ingredients from Supabase ────────────────────────────
-print("Loading scraped_ingredients from Supabase...")
-products_raw = fetch_all(
-    "scraped_ingredients",
-    "id,taxonomy,store,name,price,price_raw,price_unit,quantity,image_url,out_of_stock",
-    "id.asc"
-)
-print(f"  {len(products_raw):,} products")
-
-df_catalog = pd.DataFrame(products_raw)
-
-# Build matcher
-m = IngredientMatcher.__new__(IngredientMatcher)
-m.use_reranker = False
-m._api_key = None
-m.catalog_csv_path = "<supabase:scraped_ingredients>"
-adapted = m._adapt_scraped_catalog_format(df_catalog)
-
-required = ["productId", "brand", "description", "categories", "classifier", "search_keyword"]
-for col in required:
-    if col not in adapted.columns:
-        adapted[col] = ""
-    adapted[col] = adapted[col].fillna("")
-
-for col in ["description", "brand", "categories", "search_keyword"]:
-    adapted[col] = adapted[col].astype(str).str.replace("Â®", "®", regex=False).str.replace("â„¢", "™", regex=False)
-
-adapted["description_norm"]    = adapted["description"].map(normalize_catalog_text)
-adapted["brand_norm"]          = adapted["brand"].map(normalize_catalog_text)
-adapted["categories_norm"]     = adapted["categories"].map(normalize_catalog_text)
-adapted["classifier_norm"]     = adapted["classifier"].map(normalize_catalog_text)
-adapted["search_keyword_norm"] = adapted["search_keyword"].map(normalize_catalog_text)
-adapted["combined_text"] = (
-    adapted["description_norm"] + " " + adapted["brand_norm"] + " " +
-    adapted["categories_norm"] + " " + adapted["classifier_norm"] + " " +
-    adapted["search_keyword_norm"]
-).str.strip().str.replace(r"\s+", " ", regex=True)
-
-m.df = adapted
-m._index, m._prefix_index = m._build_index()
-print(f"Matcher ready — {len(m.df):,} products indexed.\n")
-
-
-# ── Step 2: Load recipes ──────────────────────────────────────────────────────
-print("Loading recipes from Supabase...")
-recipes_raw = fetch_all("Recipes_Kaggle", "id,Title,Cleaned_Ingredients", "id.asc")
-print(f"  {len(recipes_raw):,} recipes\n")
-
-
-# ── Step 3: Check already processed ──────────────────────────────────────────
-print("Checking already-processed recipes...")
-already_done = set()
-offset = 0
-while True:
-    batch = sb_get("scraped_recipe_matches", {
-        "select": "recipe_id", "limit": 1000,
-        "offset": offset, "order": "recipe_id.asc",
-    })
-    for row in batch:
-        already_done.add(row["recipe_id"])
-    if len(batch) < 1000:
-        break
-    offset += 1000
-
-remaining = [r for r in recipes_raw if r.get("id") not in already_done]
-print(f"  {len(already_done):,} already done — skipping.")
-print(f"  {len(remaining):,} left to process.\n")
-
-if not remaining:
-    print("All recipes already processed!")
-    exit(0)
-
-
-# ── Step 4: Match and upload ──────────────────────────────────────────────────
-INSERT_EVERY = 10
-rows_buffer = []
-processed = 0
-no_match_count = 0
-
-print(f"Processing {len(remaining):,} recipes...\n")
-
-for recipe in remaining:
-    recipe_id = recipe.get("id")
-    title     = recipe.get("Title", "")
-    cleaned   = recipe.get("Cleaned_Ingredients", "")
+        if batch:
+            yield batch
+        if len(batch) < PAGE_SIZE:
+            return
+        offset += PAGE_SIZE
+
+
+def fetch_all(table: str, columns: str, order: str) -> list:
+    return [row for page in iter_pages(table, columns, order) for row in page]
+
+
+def prefetch(pages):
+    """Yield from pages while the next page is fetched on a background thread,
+    so matching the current page overlaps the request for the next one."""
+    pages = iter(pages)
+    executor = ThreadPoolExecutor(max_workers=1)
+    try:
+        upcoming = executor.submit(next, pages, None)
+        while True:
+            page = upcoming.result()
+            if page is None:
+                return
+            upcoming = executor.submit(next, pages, None)
+            yield page
+    finally:
+        # On an early exit (upload error, Ctrl-C) don't sit through the in-flight
+        # fetch and its retries before the real error surfaces
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+INSERT_EVERY = 100   # recipes per upload; sb_post splits the rows into POST_CHUNK_ROWS requests
+
+
+class BackgroundUploader:
+    """Runs sb_post on a background thread so matching continues during uploads.
+
+    At most one upload is in flight; queuing the next one first waits for the
+    previous, which also re-raises its error instead of losing it.
+    """
+
+    def __init__(self, table: str):
+        self.table = table
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._pending: Optional[Future] = None
+
+    def submit(self, rows: list) -> None:
+        self.wait()
+        self._pending = self._executor.submit(sb_post, self.table, rows)
+
+    def wait(self) -> None:
+        if self._pending is not None:
+            pending, self._pending = self._pending, None
+            pending.result()
+
+    def close(self) -> None:
+        """Wait for the last upload and stop the thread."""
+        try:
+            self.wait()
+        finally:
+            self._executor.shutdown(wait=True)
 
-    if not cleaned:
-        continue
 
-    ingredients = parse_ingredient_list_string(cleaned)
+def recipe_ingredients(recipe: dict) -> list:
+    cleaned = recipe.get("Cleaned_Ingredients", "")
+    return parse_ingredient_list_string(cleaned) if cleaned else []
+
+
+def recipe_rows(m: IngredientMatcher, recipe: dict):
+    """Match one recipe. Returns (rows to insert, no-match count), or None when
+    the recipe has no ingredients to match."""
+    ingredients = recipe_ingredients(recipe)
     if not ingredients:
-        continue
+        return None
+    return match_rows(recipe, m.match_ingredients(ingredients, top_k=3))
 
-    match_results = m.match_ingredients(ingredients, top_k=3)
 
+def match_rows(recipe: dict, match_results: list):
+    """Turn one recipe's match results into (rows to insert, no-match count)."""
+    recipe_id = recipe.get("id")
+    title     = recipe.get("Title", "")
+
+    rows = []
+    no_match = 0
     for result in match_results:
         if result.get("skipped"):
             continue
@@ -187,8 +214,8 @@ for recipe in remaining:
         matches = result.get("matches", [])
 
         if not matches:
-            no_match_count += 1
-            rows_buffer.append({
+            no_match += 1
+            rows.append({
                 "recipe_id":          recipe_id,
                 "recipe_title":       title,
                 "raw_ingredient":     raw_ing,
@@ -204,7 +231,7 @@ for recipe in remaining:
             })
         else:
             for rank, match in enumerate(matches, start=1):
-                rows_buffer.append({
+                rows.append({
                     "recipe_id":          recipe_id,
                     "recipe_title":       title,
                     "raw_ingredient":     raw_ing,
@@ -218,19 +245,143 @@ for recipe in remaining:
                     "confidence":         match.get("confidence"),
                     "match_rank":         rank,
                 })
+    return rows, no_match
+
+
+# ── Worker processes ──────────────────────────────────────────────────────────
+# Matching is pure-Python CPU work, so recipes are spread over a process pool.
+# Each worker builds its own matcher once from the catalog handed to it.
+WORKERS = max(1, (os.cpu_count() or 2) - 1)
+
+_worker_matcher = None
+
+
+def _init_worker(df_catalog: pd.DataFrame):
+    global _worker_matcher
+    _worker_matcher = IngredientMatcher.from_dataframe(
+        df_catalog, source="<supabase:scraped_ingredients>"
+    )
+
+
+def _match_in_worker(recipe: dict):
+    return recipe_rows(_worker_matcher, recipe)
+
+
+# ── Batched reranking ─────────────────────────────────────────────────────────
+# RERANKER_BATCH=1 (with ANTHROPIC_API_KEY set) reranks matches with Claude via
+# the Message Batches API at half price. Each page of PAGE_SIZE recipes is
+# matched in this process with one match_ingredient_lists call and goes out as a
+# single batch, so a run submits one batch per page, one after the other.
+# Trade-off: every page waits for its batch — usually minutes, but up to
+# RERANKER_BATCH_TIMEOUT_SECONDS (24 h) — before its rows are uploaded. In
+# exchange, rows keep streaming to Supabase page by page and an interrupted run
+# only loses the page in flight, rather than holding the whole recipe table
+# for one run-wide batch.
+RERANKER_BATCH = os.environ.get("RERANKER_BATCH") == "1"
+
+
+def page_rows_batched(m: IngredientMatcher, recipes: list) -> list:
+    """recipe_rows for every recipe of a page, reranked in one Message Batch."""
+    ingredient_lists = [recipe_ingredients(recipe) for recipe in recipes]
+    to_match = [i for i, ingredients in enumerate(ingredient_lists) if ingredients]
+    matched = m.match_ingredient_lists([ingredient_lists[i] for i in to_match], top_k=3)
+    results = [None] * len(recipes)
+    for i, match_results in zip(to_match, matched):
+        results[i] = match_rows(recipes[i], match_results)
+    return results
+
+
+def main():
+    # ── Step 1: Load scraped_ingredients from Supabase ────────────────────────
+    print("Loading scraped_ingredients from Supabase...")
+    products_raw = fetch_all(
+        "scraped_ingredients",
+        "id,taxonomy,store,name,price,price_raw,price_unit,quantity,image_url,out_of_stock",
+        "id.asc"
+    )
+    print(f"  {len(products_raw):,} products")
+
+    df_catalog = pd.DataFrame(products_raw)
+
+    # ── Step 2: Check already processed ──────────────────────────────────────
+    print("Checking already-processed recipes...")
+    already_done = set()
+    for page in iter_pages("scraped_recipe_matches", "recipe_id", "recipe_id.asc"):
+        already_done.update(row["recipe_id"] for row in page)
+    print(f"  {len(already_done):,} already done — skipping.\n")
+
+    # ── Step 3: Stream recipes, match and upload ──────────────────────────────
+    # Recipes are read one page at a time and matched as they arrive, so the
+    # full recipe table is never held in memory; the next page is fetched
+    # while the current one is being matched.
+    rows_buffer = []
+    recipes_read = 0
+    processed = 0
+    no_match_count = 0
+
+    if RERANKER_BATCH:
+        print("Processing recipes with batched reranking, one batch per page...\n")
+    else:
+        print(f"Processing recipes on {WORKERS} worker(s)...\n")
+
+    batch_matcher = None
+    if RERANKER_BATCH:
+        batch_matcher = IngredientMatcher.from_dataframe(
+            df_catalog, use_reranker=True, reranker_batch=True,
+            source="<supabase:scraped_ingredients>",
+        )
+        pool = None
+    elif WORKERS == 1:
+        _init_worker(df_catalog)
+        pool = None
+    else:
+        pool = multiprocessing.Pool(WORKERS, initializer=_init_worker, initargs=(df_catalog,))
+    uploader = BackgroundUploader("scraped_recipe_matches")
+
+    try:
+        for page in prefetch(iter_pages("Recipes_Kaggle", "id,Title,Cleaned_Ingredients", "id.asc")):
+            recipes_read += len(page)
+            todo = [r for r in page if r.get("id") not in already_done]
+            if RERANKER_BATCH:
+                results = page_rows_batched(batch_matcher, todo)
+            elif pool is not None:
+                # imap keeps recipe order, so upload batches match a sequential run
+                results = pool.imap(_match_in_worker, todo, chunksize=8)
+            else:
+                results = map(_match_in_worker, todo)
+
+            for result in results:
+                if result is None:
+                    continue
+                rows, no_match = result
+                rows_buffer.extend(rows)
+                no_match_count += no_match
+                processed += 1
+
+                if processed % INSERT_EVERY == 0:
+                    uploader.submit(rows_buffer)
+                    rows_buffer = []
+                    print(f"  ✓ {processed:,} processed ({recipes_read:,} recipes read) | "
+                          f"total done: {processed + len(already_done):,} | "
+                          f"no match: {no_match_count}")
+        if rows_buffer:
+            uploader.submit(rows_buffer)
+    finally:
+        if pool is not None:
+            pool.terminate()
+        if batch_matcher is not None:
+            batch_matcher.close()
+        # Even on an error, let the queued upload finish so matched rows aren't lost
+        uploader.close()
+
+    if not processed:
+        print("All recipes already processed!")
+        return
 
-    processed += 1
-
-    if processed % INSERT_EVERY == 0:
-        sb_post("scraped_recipe_matches", rows_buffer)
-        rows_buffer = []
-        print(f"  ✓ {processed:,}/{len(remaining):,} | "
-              f"total done: {processed + len(already_done):,} | "
-              f"no match: {no_match_count}")
+    print(f"\nDone!")
+    print(f"  Processed: {processed:,}")
+    print(f"  No match:  {no_match_count:,}")
 
-if rows_buffer:
-    sb_post("scraped_recipe_matches", rows_buffer)
 
-print(f"\nDone!")
-print(f"  Processed: {processed:,}")
-print(f"  No match:  {no_match_count:,}")
+if __name__ == "__main__":
+    main()
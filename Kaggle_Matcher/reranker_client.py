@@ -0,0 +1,201 @@
+"""
+reranker_client.py
+==================
+Transport for the matcher's LLM reranker: Anthropic Messages and Message
+Batches API calls over a keep-alive connection, paced and retried, plus the
+on-disk cache of reply text. Prompts, and what a reply means for the ranking,
+stay in ingredient_matcher.py.
+"""
+
+import hashlib
+import http.client
+import json
+import os
+import random
+import shelve
+import threading
+import time
+import urllib.parse
+from typing import Any, Dict, List, Optional
+
+try:
+    from .http_util import HTTPStatusError, KeepAliveHTTPS, json_dumps, json_loads
+except ImportError:  # imported as a top-level module, from this directory
+    from http_util import HTTPStatusError, KeepAliveHTTPS, json_dumps, json_loads
+
+RERANKER_API_HOST = "api.anthropic.com"
+RERANKER_API_VERSION = "2023-06-01"
+# Rate-limited (429), overloaded (529) and 5xx responses, and dropped connections,
+# are retried with jittered exponential backoff before the caller falls back.
+RERANKER_MAX_RETRIES = 5
+RERANKER_BACKOFF_BASE_SECONDS = 1.0
+RERANKER_BACKOFF_MAX_SECONDS = 60.0
+RERANKER_RETRY_STATUSES = frozenset({429, 500, 502, 503, 504, 529})
+# Requests per minute across all threads (env: RERANKER_RPM); 0 leaves pacing
+# to the matcher's concurrency cap and the retries above.
+RERANKER_RPM = float(os.environ.get("RERANKER_RPM", "0"))
+# Message Batches results usually arrive within minutes, at most 24 h.
+RERANKER_BATCH_POLL_SECONDS = 15.0
+RERANKER_BATCH_TIMEOUT_SECONDS = 24 * 3600.0
+
+
+class RequestPacer:
+    """Spaces requests at least 60/rpm seconds apart, across threads."""
+
+    def __init__(self, rpm: float):
+        self._interval = 60.0 / rpm if rpm > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    def wait(self) -> None:
+        if not self._interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self._interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class ReplyCache:
+    """Reranker reply text persisted on disk, keyed by a hash of the fields
+    passed to key() (the matcher uses model, system prompt, single-ingredient
+    prompt and its cache version).
+
+    Re-running the matcher over the same recipes then skips the API round-trip
+    for every ingredient it has already seen, however the requests were
+    grouped. Safe to share between threads; not meant to be opened by several
+    processes at once.
+    """
+
+    def __init__(self, path: str):
+        self._shelf = shelve.open(path)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(**fields: Any) -> str:
+        canonical = json.dumps(fields, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            return self._shelf.get(key)
+
+    def put(self, key: str, text: str) -> None:
+        with self._lock:
+            self._shelf[key] = text
+            self._shelf.sync()
+
+    def close(self) -> None:
+        with self._lock:
+            self._shelf.close()
+
+
+def reply_text(message: Dict[str, Any]) -> Optional[str]:
+    """Text of the first text block in a Messages API response, or None."""
+    try:
+        return next(
+            block["text"]
+            for block in message.get("content", [])
+            if block.get("type") == "text"
+        )
+    except (StopIteration, KeyError, AttributeError):
+        return None
+
+
+class RerankerClient:
+    """Anthropic API client shared by a matcher's reranker threads (one
+    keep-alive socket per thread). Failures are printed and reported as None
+    or {} so the matcher can keep its fuzzy ranking."""
+
+    def __init__(self, api_key: Optional[str], rpm: float = RERANKER_RPM):
+        self._api_key = api_key
+        self._http = KeepAliveHTTPS(RERANKER_API_HOST)
+        self._pacer = RequestPacer(rpm)
+
+    def _headers(self) -> Dict[str, str]:
+        return {
+            "Content-Type": "application/json",
+            "x-api-key": self._api_key,
+            "anthropic-version": RERANKER_API_VERSION,
+        }
+
+    def request(self, method: str, path: str, payload: Any = None) -> bytes:
+        """One API request, paced to the client's rpm and retried on transient
+        failures. Raises what KeepAliveHTTPS.request raises once retries run
+        out or the error isn't transient."""
+        body = json_dumps(payload) if payload is not None else None
+        attempt = 0
+        while True:
+            self._pacer.wait()
+            try:
+                return self._http.request(method, path, body=body, headers=self._headers())
+            except HTTPStatusError as exc:
+                if exc.status not in RERANKER_RETRY_STATUSES or attempt >= RERANKER_MAX_RETRIES:
+                    raise
+                retry_after = exc.retry_after
+            except (OSError, http.client.HTTPException):
+                if attempt >= RERANKER_MAX_RETRIES:
+                    raise
+                retry_after = None
+            # Full jitter: a random wait up to the exponential cap, so threads
+            # that failed together don't retry together
+            cap = min(RERANKER_BACKOFF_MAX_SECONDS, RERANKER_BACKOFF_BASE_SECONDS * 2 ** attempt)
+            time.sleep(max(random.uniform(0, cap), retry_after or 0.0))
+            attempt += 1
+
+    def message_text(self, params: Dict[str, Any]) -> Optional[str]:
+        """Reply text for one Messages API request, or None on failure."""
+        try:
+            body = json_loads(self.request("POST", "/v1/messages", params))
+        except (OSError, http.client.HTTPException, json.JSONDecodeError) as exc:
+            # Network or parse failure — fall back silently
+            print(f"[reranker] API call failed: {exc}; using fuzzy ranking")
+            return None
+
+        text = reply_text(body)
+        if text is None:
+            print("[reranker] Unexpected response structure; using fuzzy ranking")
+        return text
+
+    def run_message_batch(self, requests: List[Dict[str, Any]]) -> Dict[str, str]:
+        """Submit a Message Batch, wait for it to end, and return reply text by
+        custom_id for every request that succeeded. Returns {} on failure."""
+        batch_id = None
+        try:
+            batch = json_loads(self.request("POST", "/v1/messages/batches", {"requests": requests}))
+            batch_id = batch["id"]
+            print(f"[reranker] Submitted batch {batch_id} with {len(requests)} requests")
+            deadline = time.monotonic() + RERANKER_BATCH_TIMEOUT_SECONDS
+            while batch["processing_status"] != "ended":
+                if time.monotonic() > deadline:
+                    print(f"[reranker] Batch {batch_id} timed out; using fuzzy ranking")
+                    self.request("POST", f"/v1/messages/batches/{batch_id}/cancel")
+                    return {}
+                time.sleep(RERANKER_BATCH_POLL_SECONDS)
+                batch = json_loads(self.request("GET", f"/v1/messages/batches/{batch_id}"))
+            results = self.request("GET", urllib.parse.urlsplit(batch["results_url"]).path)
+        except (OSError, http.client.HTTPException, json.JSONDecodeError, KeyError, TypeError) as exc:
+            print(f"[reranker] Batch {batch_id or ''} failed: {exc}; using fuzzy ranking")
+            return {}
+
+        replies: Dict[str, str] = {}
+        for line in results.splitlines():
+            if not line.strip():
+                continue
+            try:
+                entry = json_loads(line)
+            except json.JSONDecodeError:
+                continue
+            result = entry.get("result") or {}
+            if result.get("type") != "succeeded":
+                continue
+            text = reply_text(result.get("message") or {})
+            if text is not None:
+                replies[entry.get("custom_id")] = text
+        return replies
+
+    def close(self) -> None:
+        """Close the kept-alive sockets; later requests reconnect."""
+        self._http.close()
@@ -0,0 +1,166 @@
+"""
+test_ingredient_matcher.py
+--------------------------
+Offline regression checks for ingredient_matcher.py. No network access or API
+key is needed: reranker replies are stubbed on the matcher instance.
+
+Run directly (from this directory):
+    python test_ingredient_matcher.py
+
+The test_* functions also run under pytest.
+
+test_data/ holds a small catalog in each supported format (A: food_catalogue,
+B: JSON classifiers, C: priced, D: scraped), recipe ingredient lines, and the
+matches the original matcher returned for them. After an intentional change
+to scoring, regenerate the expected matches with:
+    python test_ingredient_matcher.py --update
+"""
+import json
+import math
+import os
+import sys
+
+import pandas as pd
+
+import ingredient_matcher as im
+from ingredient_matcher import IngredientMatcher
+
+TEST_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "test_data")
+CATALOG_FILES = ["catalog_a.csv", "catalog_b.csv", "catalog_c.csv", "catalog_d.csv"]
+INGREDIENTS_FILE = os.path.join(TEST_DATA_DIR, "ingredients.json")
+EXPECTED_MATCHES_FILE = os.path.join(TEST_DATA_DIR, "expected_matches.json")
+
+# Tiny format-A catalog (food_catalogue.csv columns)
+SMALL_CATALOG = pd.DataFrame([
+    {"productId": "1", "brand": "Kroger", "description": "Kroger Ground Cumin",
+     "categories": "Spices & Seasonings", "classifier": "SPICE", "search_keyword": "cumin", "price": "2.49"},
+    {"productId": "2", "brand": "McCormick", "description": "McCormick Cumin Seed",
+     "categories": "Spices & Seasonings", "classifier": "SPICE", "search_keyword": "cumin", "price": "3.99"},
+    {"productId": "3", "brand": "Lay's", "description": "Lay's Cumin Lime Chips",
+     "categories": "Snacks", "classifier": "SNACKS", "search_keyword": "", "price": "4.29"},
+])
+
+
+def _reranking_matcher(reply: str) -> IngredientMatcher:
+    """A reranking matcher whose API call always returns `reply`."""
+    matcher = IngredientMatcher.from_dataframe(
+        SMALL_CATALOG, use_reranker=True, anthropic_api_key="test-key"
+    )
+    matcher._reranker_reply = lambda user_content, max_tokens=im.RERANKER_MAX_TOKENS: reply
+    return matcher
+
+
+def _summarize(result: dict) -> dict:
+    """A match result with each match cut down to what ranking decides."""
+    summary = {}
+    for key, value in result.items():
+        if key == "matches":
+            value = [
+                [m["productId"], m["score"], m["confidence"], _nan_to_none(m["min_price"])]
+                for m in value
+            ]
+        elif key == "alternatives":
+            value = [_summarize(alt) for alt in value]
+        summary[key] = value
+    return summary
+
+
+def _nan_to_none(value):
+    return None if isinstance(value, float) and math.isnan(value) else value
+
+
+def _fixture_matches() -> dict:
+    with open(INGREDIENTS_FILE, encoding="utf-8") as fh:
+        ingredients = json.load(fh)
+    matches = {}
+    for name in CATALOG_FILES:
+        matcher = IngredientMatcher(os.path.join(TEST_DATA_DIR, name))
+        matches[name] = [_summarize(r) for r in matcher.match_ingredients(ingredients, top_k=3)]
+    return matches
+
+
+def write_expected_matches() -> None:
+    with open(EXPECTED_MATCHES_FILE, "w", encoding="utf-8") as fh:
+        json.dump(_fixture_matches(), fh, indent=1, ensure_ascii=False)
+        fh.write("\n")
+
+
+# ============================================================
+# FUZZY MATCHING
+# ============================================================
+
+def test_fixture_catalogs_match_expected():
+    with open(EXPECTED_MATCHES_FILE, encoding="utf-8") as fh:
+        expected = json.load(fh)
+    actual = _fixture_matches()
+    for name in CATALOG_FILES:
+        for want, got in zip(expected[name], actual[name]):
+            assert got == want, f"{name}: {want['raw_ingredient']!r}\n  expected {want}\n  got      {got}"
+        assert len(actual[name]) == len(expected[name])
+
+
+# Lines with no word (or 4-letter prefix) in the fixture catalogs' token index
+SAFETY_NET_INGREDIENTS = [
+    "2 cloves garlic, minced", "1 tsp tumeric", "2 cloves garlc", "pomegranate molasses",
+    "tahini", "gochujang", "1 cup quinoa", "1 tbsp sumac", "saffron threads", "1 cup farro",
+]
+
+
+def test_safety_net_probe_agrees_with_full_scan():
+    # The probe only scores the SAFETY_NET_PROBE_ROWS descriptions closest by
+    # partial_ratio, so it could give up on a line the full scan would match.
+    # It must not do so on the fixture catalogs.
+    with open(INGREDIENTS_FILE, encoding="utf-8") as fh:
+        ingredients = json.load(fh) + SAFETY_NET_INGREDIENTS
+    probe_rows = im.SAFETY_NET_PROBE_ROWS
+    for name in CATALOG_FILES:
+        path = os.path.join(TEST_DATA_DIR, name)
+        probed_matcher = IngredientMatcher(path)
+        probed = [_summarize(probed_matcher.match_ingredient(line)) for line in ingredients]
+        im.SAFETY_NET_PROBE_ROWS = len(probed_matcher.df)
+        try:
+            full_matcher = IngredientMatcher(path)
+            full = [_summarize(full_matcher.match_ingredient(line)) for line in ingredients]
+        finally:
+            im.SAFETY_NET_PROBE_ROWS = probe_rows
+        assert probed == full, name
+
+        for line in SAFETY_NET_INGREDIENTS:
+            normalized = im.normalize_ingredient(im.preprocess_ingredient(line))
+            assert probed_matcher._prefilter_candidates(normalized)[1], f"{name}: {line!r} is indexed"
+
+
+# ============================================================
+# REPLY PARSING
+# ============================================================
+
+def test_non_object_reply_falls_back_to_fuzzy_ranking():
+    # Valid JSON that isn't an object used to reach parsed.get() and raise
+    # AttributeError out of match_ingredients.
+    assert im._parse_json_object("[1, 2]") is None
+    assert im._parse_json_object('"choice"') is None
+
+    fuzzy = IngredientMatcher.from_dataframe(SMALL_CATALOG).match_ingredient("1 tsp ground cumin")
+    for reply in ("[0]", "[]", "42", "null"):
+        result = _reranking_matcher(reply).match_ingredient("1 tsp ground cumin")
+        assert [m["productId"] for m in result["matches"]] == [m["productId"] for m in fuzzy["matches"]]
+        assert not any(m.get("reranker_choice") for m in result["matches"])
+
+
+def test_fenced_object_reply_is_applied():
+    result = _reranking_matcher('```json\n{"choice": 0, "reason": "ground"}\n```').match_ingredient(
+        "1 tsp ground cumin"
+    )
+    assert result["matches"][0].get("reranker_choice")
+
+
+if __name__ == "__main__":
+    if "--update" in sys.argv[1:]:
+        write_expected_matches()
+        print(f"wrote {EXPECTED_MATCHES_FILE}")
+        sys.exit()
+    tests = [(name, func) for name, func in sorted(globals().items()) if name.startswith("test_")]
+    for name, func in tests:
+        func()
+        print(f"ok  {name}")
+    print(f"\n{len(tests)} passed")
@@ -10,7 +10,13 @@ print(f"Loading catalog: {CATALOG}")
 matcher = IngredientMatcher(CATALOG)
 print(f"Ready. Testing recipes {START_RECIPE}–{START_RECIPE + NUM_RECIPES - 1}\n")
 
-recipes = pd.read_csv("RecipesDataset_with_urls.csv")
+# Parse only the two columns used below, and stop reading after the window.
+# (nrows counts records, so multi-line quoted fields are handled correctly.)
+recipes = pd.read_csv(
+    "RecipesDataset_with_urls.csv",
+    usecols=["Title", "Cleaned_Ingredients"],
+    nrows=START_RECIPE + NUM_RECIPES,
+).iloc[START_RECIPE:]
 
 
 def format_price(match):
@@ -50,15 +56,15 @@ def print_result(r, file, indent=""):
 
 
 with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
-    for i in range(START_RECIPE, START_RECIPE + NUM_RECIPES):
-        row = recipes.iloc[i]
-        ingredients = parse_ingredient_list_string(row["Cleaned_Ingredients"])
+    rows = zip(recipes["Title"].tolist(), recipes["Cleaned_Ingredients"].tolist())
+    for i, (title, cleaned_ingredients) in enumerate(rows, start=START_RECIPE):
+        ingredients = parse_ingredient_list_string(cleaned_ingredients)
 
         f.write("\n====================================================\n")
-        f.write(f"Recipe: {row['Title']}\n")
+        f.write(f"Recipe: {title}\n")
         f.write("----------------------------------------------------\n")
 
-        print(f"  [{i+1}/{START_RECIPE + NUM_RECIPES - 1}] {row['Title']}")
+        print(f"  [{i+1}/{START_RECIPE + NUM_RECIPES - 1}] {title}")
 
         results = matcher.match_ingredients(ingredients, top_k=3)
         for r in results:
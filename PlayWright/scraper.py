@@ -427,39 +427,65 @@ async def run_pipeline(limit: int | None = None) -> None:
         print(f"  {len(ingredients)} ingredients loaded.")
 
     total_upserted = 0
-
-    # Scrape
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(
-            headless=False,
-            args=["--disable-blink-features=AutomationControlled"],
-        )
-        context = await browser.new_context(
-            user_agent=(
-                "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
-                "AppleWebKit/537.36 (KHTML, like Gecko) "
-                "Chrome/122.0.0.0 Safari/537.36"
-            ),
-            viewport={"width": 1280, "height": 900},
+    # The supabase client is synchronous; the upsert runs on a worker thread so
+    # the next query can scrape while the previous batch is still uploading.
+    # Only one upsert is in flight at a time, so rows sharing an id are written
+    # in scrape order and a failed upload stops the scrape at the next batch.
+    pending_upsert: asyncio.Task | None = None
+
+    async def upsert(rows: list[dict]) -> int:
+        await asyncio.to_thread(
+            lambda: supabase.table("ingredients").upsert(rows, on_conflict="id").execute()
         )
-        page = await context.new_page()
-
-        for ingredient in ingredients:
-            search_term, filter_word = parse_ingredient(ingredient)
-            print(f"\n[{ingredient}]  search='{search_term}'  filter={filter_word!r}")
-
-            products = await scrape_query(page, search_term)
-            products = apply_name_filter(products, filter_word)
+        return len(rows)
 
-            rows = [{"taxonomy": ingredient, **p} for p in products]
+    async def finish_pending_upsert() -> int:
+        nonlocal pending_upsert
+        task, pending_upsert = pending_upsert, None
+        return await task if task is not None else 0
 
-            if rows:
-                supabase.table("ingredients").upsert(rows, on_conflict="id").execute()
-                total_upserted += len(rows)
-
-            print(f"  → {len(rows)} products upserted")
-
-        await browser.close()
+    # Scrape
+    try:
+        async with async_playwright() as p:
+            browser = await p.chromium.launch(
+                headless=False,
+                args=["--disable-blink-features=AutomationControlled"],
+            )
+            context = await browser.new_context(
+                user_agent=(
+                    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
+                    "AppleWebKit/537.36 (KHTML, like Gecko) "
+                    "Chrome/122.0.0.0 Safari/537.36"
+                ),
+                viewport={"width": 1280, "height": 900},
+            )
+            page = await context.new_page()
+
+            for ingredient in ingredients:
+                search_term, filter_word = parse_ingredient(ingredient)
+                print(f"\n[{ingredient}]  search='{search_term}'  filter={filter_word!r}")
+
+                products = await scrape_query(page, search_term)
+                products = apply_name_filter(products, filter_word)
+
+                rows = [{"taxonomy": ingredient, **p} for p in products]
+
+                if rows:
+                    total_upserted += await finish_pending_upsert()
+                    pending_upsert = asyncio.create_task(upsert(rows))
+
+                print(f"  → {len(rows)} products queued for upsert")
+
+            await browser.close()
+    except BaseException:
+        # Scraping failed partway: still save the last scraped batch, but keep
+        # the scrape error as the one that propagates
+        try:
+            total_upserted += await finish_pending_upsert()
+        except Exception as exc:
+            print(f"  ⚠️  Last queued upsert also failed: {exc}")
+        raise
+    total_upserted += await finish_pending_upsert()
 
     print(f"\nDone. {total_upserted} total rows upserted to Supabase.")
 